@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal_column, select, union_all
+
+from models import db, Venta, Producto, Categoria, VentaResumenDiario
+
+# Las agregaciones se resuelven en SQL con GROUP BY; solo viajan escalares,
+# nunca objetos Venta/Producto completos. Los días cerrados se leen de
+# venta_resumen_diario y solo el día en curso se calcula desde la tabla venta,
+# así el costo de un reporte crece con los días y no con las transacciones.
+# Los rangos se expresan en fechas: desde inclusive, hasta exclusivo.
+
+
+def _inicio_del_dia(fecha):
+    return datetime(fecha.year, fecha.month, fecha.day)
+
+
+def consulta_hechos(desde=None, hasta=None):
+    """Subconsulta (fecha, producto_id, categoria_id, unidades, total) sobre la que se agrega."""
+    hoy = datetime.utcnow().date()  # Venta.fecha se guarda en UTC
+    # Acepta también datetime (p. ej. los de rango_fechas()); el resumen se compara por día
+    desde, hasta = (valor.date() if isinstance(valor, datetime) else valor for valor in (desde, hasta))
+
+    historico = select(
+        VentaResumenDiario.fecha.label('fecha'),
+        VentaResumenDiario.producto_id.label('producto_id'),
+        VentaResumenDiario.categoria_id.label('categoria_id'),
+        VentaResumenDiario.unidades.label('unidades'),
+        VentaResumenDiario.total.label('total'),
+    ).where(VentaResumenDiario.fecha < hoy)
+    if desde is not None:
+        historico = historico.where(VentaResumenDiario.fecha >= desde)
+    if hasta is not None:
+        historico = historico.where(VentaResumenDiario.fecha < hasta)
+
+    inicio = _inicio_del_dia(max(desde, hoy) if desde is not None else hoy)
+    actual = (
+        select(
+            func.date(Venta.fecha).label('fecha'),
+            Venta.producto_id.label('producto_id'),
+            Producto.categoria_id.label('categoria_id'),
+            Venta.cantidad.label('unidades'),
+            Venta.total.label('total'),
+        )
+        .join(Producto, Venta.producto_id == Producto.id)
+        .where(Venta.fecha >= inicio)
+    )
+    if hasta is not None:
+        actual = actual.where(Venta.fecha < _inicio_del_dia(hasta))
+
+    return union_all(historico, actual).subquery('hechos')
+
+
+def _monto(hechos):
+    return func.coalesce(func.sum(hechos.c.total), 0)
+
+
+def _periodo(columna, periodo):
+    # Agrupa por día (YYYY-MM-DD) o por mes (YYYY-MM) según el motor de base de datos
+    if periodo == 'dia':
+        return columna
+    if db.engine.dialect.name == 'sqlite':
+        return func.strftime('%Y-%m', columna)
+    return func.to_char(columna, literal_column("'YYYY-MM'"))
+
+
+def total_ventas(desde=None, hasta=None):
+    hechos = consulta_hechos(desde, hasta)
+    return db.session.execute(select(_monto(hechos))).scalar()
+
+
+def ventas_de_hoy():
+    hoy = datetime.utcnow().date()
+    return total_ventas(hoy, hoy + timedelta(days=1))
+
+
+def consulta_ventas_por_producto(desde=None, hasta=None):
+    hechos = consulta_hechos(desde, hasta)
+    return (
+        select(
+            Producto.id.label('producto_id'),
+            Producto.nombre.label('nombre'),
+            func.sum(hechos.c.unidades).label('unidades'),
+            _monto(hechos).label('total'),
+        )
+        .join(Producto, hechos.c.producto_id == Producto.id)
+        .group_by(Producto.id, Producto.nombre)
+        .order_by(_monto(hechos).desc())
+    )
+
+
+def ventas_por_producto(desde=None, hasta=None):
+    return db.session.execute(consulta_ventas_por_producto(desde, hasta)).all()
+
+
+def ventas_por_categoria(desde=None, hasta=None):
+    hechos = consulta_hechos(desde, hasta)
+    nombre_categoria = func.coalesce(Categoria.nombre, 'Sin Categoría')
+    consulta = (
+        select(
+            nombre_categoria.label('categoria'),
+            func.sum(hechos.c.unidades).label('unidades'),
+            _monto(hechos).label('total'),
+        )
+        .select_from(hechos)
+        .outerjoin(Categoria, hechos.c.categoria_id == Categoria.id)
+        .group_by(nombre_categoria)
+        .order_by(_monto(hechos).desc())
+    )
+    return db.session.execute(consulta).all()
+
+
+def ventas_por_periodo(periodo='dia', desde=None, hasta=None):
+    hechos = consulta_hechos(desde, hasta)
+    clave = _periodo(hechos.c.fecha, periodo)
+    consulta = (
+        select(
+            clave.label('periodo'),
+            func.sum(hechos.c.unidades).label('unidades'),
+            _monto(hechos).label('total'),
+        )
+        .group_by(clave)
+        .order_by(clave)
+    )
+    return db.session.execute(consulta).all()
@@ -0,0 +1,158 @@
+import json
+import threading
+from collections import deque
+
+from sqlalchemy import delete, event, func, insert, select, update
+
+from models import db, Producto, Categoria, AlertaStock, UMBRAL_STOCK_BAJO
+
+# Alertas de stock bajo. El umbral de reposición de un producto es el suyo, o
+# el de su categoría, o UMBRAL_STOCK_BAJO. La revisión es incremental: cada
+# movimiento registrado en inventario.py revisa solo los productos afectados y
+# abre o cierra su fila en alerta_stock. Los cambios se publican después del
+# commit en un canal que alimenta el stream SSE de los dashboards abiertos.
+#
+# Con CACHE_URL el canal es Redis pub/sub y las alertas llegan a todos los
+# workers; sin ella, solo a los navegadores conectados al mismo proceso.
+
+CANAL = 'veterinaria:alertas'
+
+
+def umbral_efectivo():
+    return func.coalesce(Producto.umbral_reposicion, Categoria.umbral_reposicion, UMBRAL_STOCK_BAJO)
+
+
+class CanalLocal:
+    """Canal en memoria del proceso: los oyentes esperan en una condición."""
+
+    def __init__(self, max_eventos=100):
+        self._condicion = threading.Condition()
+        self._eventos = deque(maxlen=max_eventos)
+        self._ultimo = 0
+
+    def publicar(self, evento):
+        with self._condicion:
+            self._ultimo += 1
+            self._eventos.append((self._ultimo, evento))
+            self._condicion.notify_all()
+
+    def escuchar(self, espera):
+        # Entrega los eventos nuevos; None cada `espera` segundos sin eventos
+        visto = self._ultimo
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: self._ultimo > visto, timeout=espera)
+                nuevos = [evento for numero, evento in self._eventos if numero > visto]
+                visto = self._ultimo
+            if not nuevos:
+                yield None
+            yield from nuevos
+
+
+class CanalRedis:
+    """Canal compartido entre procesos con Redis pub/sub; requiere el paquete redis."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL requiere instalar el paquete 'redis'.") from e
+        self._cliente = redis.Redis.from_url(url)
+
+    def publicar(self, evento):
+        self._cliente.publish(CANAL, json.dumps(evento))
+
+    def escuchar(self, espera):
+        suscripcion = self._cliente.pubsub(ignore_subscribe_messages=True)
+        suscripcion.subscribe(CANAL)
+        try:
+            while True:
+                mensaje = suscripcion.get_message(timeout=espera)
+                yield json.loads(mensaje['data']) if mensaje else None
+        finally:
+            suscripcion.close()
+
+
+_config = {'canal': CanalLocal()}
+
+
+def init_app(app):
+    url = app.config.get('CACHE_URL')
+    _config['canal'] = CanalRedis(url) if url else CanalLocal()
+
+
+def escuchar(espera=15):
+    return _config['canal'].escuchar(espera)
+
+
+def revisar(producto_ids):
+    """Abre, actualiza o cierra las alertas de los productos indicados.
+
+    Se ejecuta dentro de la transacción que cambió el stock; los eventos se
+    publican recién cuando esa transacción se confirma.
+    """
+    if not producto_ids:
+        return
+    filas = db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.stock, umbral_efectivo().label('umbral'),
+               AlertaStock.id.label('alerta_id'))
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(AlertaStock, AlertaStock.producto_id == Producto.id)
+        .where(Producto.id.in_(set(producto_ids)))
+    ).all()
+
+    abrir = [fila for fila in filas if fila.stock < fila.umbral and fila.alerta_id is None]
+    seguir = [fila for fila in filas if fila.stock < fila.umbral and fila.alerta_id is not None]
+    cerrar = [fila for fila in filas if fila.stock >= fila.umbral and fila.alerta_id is not None]
+
+    if abrir:
+        db.session.execute(insert(AlertaStock), [
+            {'producto_id': fila.id, 'stock': fila.stock, 'umbral': fila.umbral} for fila in abrir
+        ])
+    if seguir:
+        db.session.execute(update(AlertaStock), [
+            {'id': fila.alerta_id, 'stock': fila.stock, 'umbral': fila.umbral} for fila in seguir
+        ])
+    if cerrar:
+        db.session.execute(delete(AlertaStock).where(AlertaStock.id.in_([fila.alerta_id for fila in cerrar])))
+
+    if abrir or cerrar:
+        activas = contar()
+        pendientes = db.session.info.setdefault('alertas_pendientes', [])
+        pendientes += [
+            {'tipo': tipo, 'producto_id': fila.id, 'nombre': fila.nombre, 'stock': fila.stock,
+             'umbral': fila.umbral, 'activas': activas}
+            for tipo, grupo in (('abierta', abrir), ('cerrada', cerrar))
+            for fila in grupo
+        ]
+
+
+def revisar_categoria(categoria_id):
+    """Revisa todos los productos de una categoría (p. ej. al cambiar su umbral)."""
+    revisar(db.session.scalars(select(Producto.id).where(Producto.categoria_id == categoria_id)).all())
+
+
+def contar():
+    return db.session.execute(select(func.count()).select_from(AlertaStock)).scalar()
+
+
+def consulta_alertas():
+    """Productos con alerta abierta, del menor stock relativo al umbral al mayor."""
+    return (
+        db.session.query(Producto, AlertaStock.umbral)
+        .join(AlertaStock, AlertaStock.producto_id == Producto.id)
+        .order_by((Producto.stock - AlertaStock.umbral), Producto.nombre)
+    )
+
+
+def _publicar_pendientes(sesion):
+    for evento in sesion.info.pop('alertas_pendientes', []):
+        _config['canal'].publicar(evento)
+
+
+def _descartar_pendientes(sesion, transaccion):
+    sesion.info.pop('alertas_pendientes', None)
+
+
+event.listen(db.session, 'after_commit', _publicar_pendientes)
+event.listen(db.session, 'after_soft_rollback', _descartar_pendientes)
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from models import db, Producto, Categoria, Venta, HistorialStock
+import catalogo
+import agregaciones
+import alertas
+
+# Analítica de ventas para compras: más vendidos, clasificación ABC, velocidad
+# de venta, días de stock restantes y cantidad sugerida a reponer, por
+# producto y por categoría. Las ventas se leen de consulta_hechos (resumen
+# diario para los días cerrados, tabla venta para hoy) agrupadas por día y
+# producto, en tramos tipados con pd.read_sql; cada tramo se reduce a una fila
+# por producto, así la memoria no depende de la cantidad de ventas. Todo el
+# cálculo es por columnas con pandas/NumPy, sin recorrer filas en Python.
+#
+# El resultado se guarda en caché con una clave armada con valores leídos de la
+# base (ver _marca_de_datos): la última venta, el último movimiento de stock y
+# marcas de productos y categorías. Cualquier venta, movimiento, alta, baja o
+# cambio de umbral genera una clave nueva en todos los workers, sin tener que
+# invalidar nada ni compartir la caché. Con CACHE_URL la caché es Redis, como el catálogo.
+
+PREFIJO = 'veterinaria:analitica:'
+PERIODOS = (30, 90, 180, 365)  # Días que se ofrecen en el reporte
+FILAS_POR_TRAMO = 100000
+
+# Clasificación ABC por participación acumulada en el total vendido
+LIMITE_A = 0.80
+LIMITE_B = 0.95
+
+TIPOS_VENTAS = {'producto_id': 'int64', 'unidades': 'int64', 'total': 'float64'}
+TIPOS_PRODUCTOS = {'nombre': 'string', 'stock': 'int64', 'precio': 'float64', 'categoria': 'string', 'umbral': 'int64'}
+
+_config = {'backend': catalogo.CacheLocal(max_entradas=16), 'ttl': 3600, 'plazo': 7, 'cobertura': 30}
+
+
+def init_app(app):
+    _config['ttl'] = app.config.get('ANALITICA_CACHE_TTL', 3600)
+    _config['plazo'] = app.config.get('ANALITICA_PLAZO_DIAS', 7)
+    _config['cobertura'] = app.config.get('ANALITICA_COBERTURA_DIAS', 30)
+    url = app.config.get('CACHE_URL')
+    _config['backend'] = catalogo.CacheRedis(url) if url else catalogo.CacheLocal(max_entradas=16)
+
+
+def cargar_ventas(desde, hasta, filas_por_tramo=FILAS_POR_TRAMO):
+    """DataFrame indexado por producto_id con unidades, total y días con venta en [desde, hasta)."""
+    hechos = agregaciones.consulta_hechos(desde, hasta)
+    consulta = (
+        select(hechos.c.producto_id, func.sum(hechos.c.unidades).label('unidades'),
+               func.sum(hechos.c.total).label('total'))
+        .group_by(hechos.c.fecha, hechos.c.producto_id)
+    )
+    # Cada fila es un día de un producto: contarlas da los días con venta
+    parciales = [
+        tramo.groupby('producto_id').agg(unidades=('unidades', 'sum'), total=('total', 'sum'),
+                                         dias_con_venta=('unidades', 'size'))
+        for tramo in pd.read_sql(consulta, db.session.connection(), chunksize=filas_por_tramo, dtype=TIPOS_VENTAS)
+    ]
+    if not parciales:
+        return pd.DataFrame({'unidades': [], 'total': [], 'dias_con_venta': []},
+                            index=pd.Index([], name='producto_id', dtype='int64'))
+    return pd.concat(parciales).groupby(level=0).sum()
+
+
+def cargar_productos():
+    """DataFrame indexado por producto_id con nombre, stock, precio, categoría y umbral de reposición."""
+    consulta = (
+        select(Producto.id.label('producto_id'), Producto.nombre, Producto.stock, Producto.precio,
+               Producto.categoria_id, func.coalesce(Categoria.nombre, 'Sin Categoría').label('categoria'),
+               alertas.umbral_efectivo().label('umbral'))
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+    )
+    productos = pd.read_sql(consulta, db.session.connection(), index_col='producto_id', dtype=TIPOS_PRODUCTOS)
+    # Bases antiguas de SQLite pueden tener categoria_id = '': se lee como sin categoría
+    productos['categoria_id'] = pd.to_numeric(productos['categoria_id'], errors='coerce').astype('Int64')
+    return productos
+
+
+def calcular(productos, ventas, dias, plazo, cobertura):
+    """Devuelve (por producto, por categoría) a partir de los DataFrames de cargar_productos y cargar_ventas.
+
+    velocidad es unidades por día en el período; dias_de_stock, cuántos días
+    alcanza el stock a esa velocidad (NaN si no se vendió). Se sugiere reponer
+    hasta cubrir el plazo de reposición más `cobertura` días por sobre el umbral.
+    """
+    df = productos.join(ventas, how='left')
+    df[['unidades', 'total', 'dias_con_venta']] = df[['unidades', 'total', 'dias_con_venta']].fillna(0)
+    df = df.astype({'unidades': 'int64', 'dias_con_venta': 'int64'})
+    df = df.sort_values(['total', 'unidades'], ascending=False, kind='stable')
+
+    total = df['total'].sum()
+    participacion = df['total'] / total if total else pd.Series(0.0, index=df.index)
+    # Participación acumulada antes de cada producto: el que cruza el límite queda en la clase anterior
+    previa = participacion.cumsum() - participacion
+    vendio = df['total'] > 0
+    df['participacion'] = participacion
+    df['clase'] = np.select([vendio & (previa < LIMITE_A), vendio & (previa < LIMITE_B)], ['A', 'B'], 'C')
+
+    df['velocidad'] = df['unidades'] / dias
+    df['dias_de_stock'] = df['stock'] / df['velocidad'].replace(0, np.nan)
+    objetivo = np.ceil(df['velocidad'] * (plazo + cobertura)) + df['umbral']
+    df['sugerido'] = (objetivo - df['stock']).clip(lower=0).astype('int64')
+    df['reponer'] = (df['stock'] < df['umbral']) | (df['dias_de_stock'] < plazo)
+
+    df['es_a'] = df['clase'] == 'A'
+    categorias = (
+        df.groupby(['categoria_id', 'categoria'], dropna=False, sort=False)
+        .agg(productos=('nombre', 'size'), unidades=('unidades', 'sum'), total=('total', 'sum'),
+             productos_a=('es_a', 'sum'), por_reponer=('reponer', 'sum'), sugerido=('sugerido', 'sum'))
+        .reset_index()
+        .sort_values('total', ascending=False, kind='stable')
+    )
+    categorias['participacion'] = categorias['total'] / total if total else 0.0
+    categorias['velocidad'] = categorias['unidades'] / dias
+    return df.drop(columns='es_a').reset_index(), categorias
+
+
+def _registros(df, columnas):
+    # Redondeo de presentación y NaN/NA -> None para que el resultado sea JSON
+    df = df[columnas].round({'participacion': 4, 'velocidad': 3, 'dias_de_stock': 1})
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+COLUMNAS_PRODUCTOS = ['producto_id', 'nombre', 'categoria', 'stock', 'umbral', 'precio', 'unidades', 'total',
+                      'dias_con_venta', 'participacion', 'clase', 'velocidad', 'dias_de_stock', 'sugerido', 'reponer']
+COLUMNAS_CATEGORIAS = ['categoria_id', 'categoria', 'productos', 'unidades', 'total', 'participacion',
+                       'velocidad', 'productos_a', 'por_reponer', 'sugerido']
+
+
+def _analizar(dias, hoy):
+    desde = hoy - timedelta(days=dias - 1)
+    productos, categorias = calcular(cargar_productos(), cargar_ventas(desde, hoy + timedelta(days=1)),
+                                     dias, _config['plazo'], _config['cobertura'])
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hoy.isoformat(),
+        'dias': dias,
+        'plazo_reposicion': _config['plazo'],
+        'cobertura': _config['cobertura'],
+        'generado': datetime.utcnow().isoformat(timespec='seconds'),
+        'ultima_venta_id': db.session.execute(select(func.max(Venta.id))).scalar() or 0,
+        'resumen': {
+            'productos': len(productos),
+            'unidades': int(productos['unidades'].sum()),
+            'total': float(productos['total'].sum()),
+            'clases': {clase: int((productos['clase'] == clase).sum()) for clase in ('A', 'B', 'C')},
+            'por_reponer': int(productos['reponer'].sum()),
+        },
+        # Ordenados del más vendido al menos vendido
+        'productos': _registros(productos, COLUMNAS_PRODUCTOS),
+        'categorias': _registros(categorias, COLUMNAS_CATEGORIAS),
+    }
+
+
+def _marca_de_datos():
+    # Una sola consulta con los valores que cambian cuando cambia algo que el
+    # cálculo lee. updated_at cubre los cambios de umbral y de precio (se
+    # actualiza también en los UPDATE masivos del importador); el conteo y el
+    # último id de producto cubren las altas y las bajas.
+    marcas = db.session.execute(select(
+        select(func.max(Venta.id)).scalar_subquery(),
+        select(func.max(HistorialStock.id)).scalar_subquery(),
+        select(func.count(Producto.id)).scalar_subquery(),
+        select(func.max(Producto.id)).scalar_subquery(),
+        select(func.max(Producto.updated_at)).scalar_subquery(),
+        select(func.max(Categoria.updated_at)).scalar_subquery(),
+    )).one()
+    return ':'.join('' if marca is None else str(marca) for marca in marcas)
+
+
+def analizar(dias=90):
+    """Analítica de los últimos `dias` días (incluido hoy, UTC) como diccionario serializable a JSON."""
+    if dias < 1:
+        raise ValueError("El período debe tener al menos un día.")
+    hoy = datetime.utcnow().date()
+    clave = f"{PREFIJO}{dias}:{hoy.isoformat()}:{_marca_de_datos()}"
+
+    backend = _config['backend']
+    resultado = backend.obtener(clave)
+    if resultado is None:
+        resultado = _analizar(dias, hoy)
+        backend.guardar(clave, resultado, _config['ttl'])
+    return resultado
@@ -0,0 +1,144 @@
+from flask import Blueprint, jsonify, request, url_for
+from flask_login import current_user, login_user, logout_user
+from sqlalchemy import select
+
+from models import db, Producto, Categoria, Venta, Usuario
+import archivo
+import autenticacion
+import boletas
+import busqueda
+import caja
+
+# API JSON versionada para terminales de venta y lectores de código de barras.
+# Las respuestas son pequeñas y no renderizan plantillas; la autenticación es
+# la misma sesión de Flask-Login (POST /api/v1/sesion la inicia sin formulario).
+
+bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# Máximo de productos por consulta de stock
+MAX_IDS_STOCK = 200
+
+
+def _error(mensaje, estado, **extra):
+    return jsonify(error=mensaje, **extra), estado
+
+
+@bp.before_request
+def exigir_sesion():
+    # Sin redirecciones a la página de login: un terminal necesita un 401
+    if request.endpoint != 'api_v1.iniciar_sesion' and not current_user.is_authenticated:
+        return _error("Se requiere iniciar sesión.", 401)
+
+
+@bp.route('/sesion', methods=['POST'])
+def iniciar_sesion():
+    datos = request.get_json(silent=True) or {}
+    usuario = Usuario.query.filter_by(username=datos.get('username')).first()
+    if usuario is None or not autenticacion.verificar_password(usuario, datos.get('password') or ''):
+        return _error("Usuario o contraseña incorrectos.", 401)
+    login_user(usuario, remember=bool(datos.get('recordar')))
+    return jsonify(id=usuario.id, username=usuario.username)
+
+
+@bp.route('/sesion', methods=['DELETE'])
+def cerrar_sesion():
+    logout_user()
+    return '', 204
+
+
+def _producto_json(fila):
+    return {
+        'id': fila.id,
+        'nombre': fila.nombre,
+        'precio': fila.precio,
+        'stock': fila.stock,
+        'categoria': fila.categoria,
+    }
+
+
+@bp.route('/productos')
+def buscar_productos():
+    # Búsqueda por nombre (índice de texto completo), ordenada por relevancia
+    termino = request.args.get('q', '').strip()
+    limite = request.args.get('limite', 10, type=int)
+    solo_con_stock = request.args.get('con_stock') == '1'
+    productos = busqueda.buscar_productos(termino, limite, solo_con_stock) if termino else []
+    return jsonify([
+        {'id': p.id, 'nombre': p.nombre, 'precio': p.precio, 'stock': p.stock} for p in productos
+    ])
+
+
+@bp.route('/productos/<int:producto_id>')
+def ver_producto(producto_id):
+    fila = db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.stock, Categoria.nombre.label('categoria'))
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .where(Producto.id == producto_id)
+    ).first()
+    if fila is None:
+        return _error("Producto no encontrado.", 404)
+    return jsonify(_producto_json(fila))
+
+
+@bp.route('/stock')
+def consultar_stock():
+    # ?ids=1,2,3 devuelve el stock de varios productos con una sola consulta
+    try:
+        ids = sorted({int(valor) for valor in request.args.get('ids', '').split(',') if valor.strip()})
+    except ValueError:
+        return _error("Los ids deben ser números enteros separados por comas.", 400)
+    if not ids:
+        return _error("Indica al menos un id de producto.", 400)
+    if len(ids) > MAX_IDS_STOCK:
+        return _error(f"No se pueden consultar más de {MAX_IDS_STOCK} productos a la vez.", 400)
+
+    stock = dict(db.session.execute(select(Producto.id, Producto.stock).where(Producto.id.in_(ids))).all())
+    return jsonify([
+        {'producto_id': producto_id, 'stock': stock.get(producto_id), 'existe': producto_id in stock}
+        for producto_id in ids
+    ])
+
+
+@bp.route('/ventas', methods=['POST'])
+def registrar_venta():
+    # Recibe {"lineas": [{"producto_id": 1, "cantidad": 2}, ...]} y cobra todo en una transacción
+    datos = request.get_json(silent=True) or {}
+    try:
+        boleta = caja.cobrar_y_confirmar(datos.get('lineas'))
+    except caja.StockInsuficiente as e:
+        return _error(str(e), 409, productos=e.como_json())
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    for linea in boleta['lineas']:
+        linea['boleta'] = url_for('api_v1.ver_boleta', venta_id=linea['venta_id'])
+    return jsonify(boleta), 201
+
+
+@bp.route('/ventas/<int:venta_id>')
+def ver_venta(venta_id):
+    ventas = archivo.fuente(Venta)
+    fila = db.session.execute(
+        select(ventas.id, ventas.fecha, ventas.cantidad, ventas.precio_unitario, ventas.total,
+               ventas.producto_id, Producto.nombre)
+        .join(Producto, ventas.producto_id == Producto.id)
+        .where(ventas.id == venta_id)
+    ).first()
+    if fila is None:
+        return _error("Venta no encontrada.", 404)
+    return jsonify({
+        'venta_id': fila.id,
+        'fecha': fila.fecha.isoformat() if fila.fecha else None,
+        'producto_id': fila.producto_id,
+        'nombre': fila.nombre,
+        'cantidad': fila.cantidad,
+        'precio_unitario': fila.precio_unitario,
+        'total': fila.total,
+        'boleta': url_for('api_v1.ver_boleta', venta_id=fila.id),
+    })
+
+
+@bp.route('/ventas/<int:venta_id>/boleta')
+def ver_boleta(venta_id):
+    # La boleta en PDF desde la caché de boletas (con ETag)
+    return boletas.enviar_boleta(venta_id)
@@ -1,118 +1,194 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, send_file
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, jsonify, flash, send_file, abort, Response, stream_with_context
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from flask_migrate import Migrate
-from xhtml2pdf import pisa
-from io import BytesIO
 import os
+import json
 from werkzeug.utils import secure_filename
-import pandas as pd
-from models import db, Usuario, Producto, Venta, Categoria, HistorialStock, ProductoEliminado
-from datetime import datetime
-from sqlalchemy import text, create_engine
-
-# Configuración inicial
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///veterinaria.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'clave_secreta'
-
-# Configuración para subir archivos
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-# Inicialización de extensiones
-db.init_app(app)  # Vincula SQLAlchemy con la aplicación Flask
-migrate = Migrate(app, db)
+from models import db, Usuario, Producto, Venta, Categoria, ProductoEliminado, UMBRAL_STOCK_BAJO
+from paginacion import paginar_ventas, paginar_historial
+from config import configuraciones
+import agregaciones
+import resumen_diario
+import inventario
+import caja
+import importador
+import trabajos
+import boletas
+import exportaciones
+import indices
+import busqueda
+import metricas
+import catalogo
+import autenticacion
+import migrador
+import api
+import alertas
+import datos_sinteticos
+import reportes_pdf
+import programador
+import archivo
+import analitica
+from datetime import datetime, timedelta
+from sqlalchemy import event, select
+import click
+
+# Las rutas se registran en un blueprint y create_app() arma la aplicación
+# con el perfil de configuración elegido (ver config.py y wsgi.py).
+bp = Blueprint('main', __name__, cli_group=None)
+migrate = Migrate()
 
 # Configuración de Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'  # Redirige a la página de login si no está autenticado
+login_manager.login_view = 'main.login'  # Redirige a la página de login si no está autenticado
 login_manager.login_message = "Por favor, inicia sesión para acceder a esta página."
 login_manager.login_message_category = "warning"
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
+    # Datos de sesión desde caché: las páginas no consultan la tabla usuario en cada petición
+    return autenticacion.cargar_usuario(user_id)
+
+
+def _configurar_sqlite(engine, pragmas):
+    # Cada conexión nueva del pool recibe los PRAGMAs: con un servidor WSGI no
+    # hay un único punto de arranque donde ejecutarlos una sola vez
+    def aplicar_pragmas(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        cursor.close()
+
+    event.listen(engine, 'connect', aplicar_pragmas)
+
+
+def _configurar_postgresql(engine):
+    # Las fechas se guardan sin zona horaria y el código las trata como UTC,
+    # igual que CURRENT_TIMESTAMP en SQLite
+    def zona_horaria_utc(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        cursor.execute("SET TIME ZONE 'UTC'")
+        cursor.close()
+
+    event.listen(engine, 'connect', zona_horaria_utc)
+
+
+def create_app(nombre_config=None, configuracion=None):
+    # `configuracion` reemplaza valores del perfil (p. ej. carpetas temporales en las pruebas)
+    nombre_config = nombre_config or os.environ.get('VETERINARIA_CONFIG', 'development')
+    app = Flask(__name__)
+    app.config.from_object(configuraciones[nombre_config])
+    app.config.update(configuracion or {})
+    if nombre_config == 'production' and app.config['SECRET_KEY'] == 'clave_secreta':
+        raise RuntimeError("Define la variable de entorno SECRET_KEY para el perfil de producción.")
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    # Inicialización de extensiones
+    db.init_app(app)  # Vincula SQLAlchemy con la aplicación Flask
+    migrate.init_app(app, db)
+    login_manager.init_app(app)
+    metricas.init_app(app)
+    catalogo.init_app(app)
+    autenticacion.init_app(app)
+    alertas.init_app(app)
+    programador.init_app(app)
+    analitica.init_app(app)
 
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            _configurar_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        elif db.engine.dialect.name == 'postgresql':
+            _configurar_postgresql(db.engine)
+
+    app.register_blueprint(bp)
+    app.register_blueprint(api.bp)  # API JSON /api/v1 para terminales de venta
+    return app
 
 
 # Rutas de la aplicación
-@app.route('/')
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))  # Redirige al dashboard si está autenticado
-    return redirect(url_for('login'))  # Redirige al login si no está autenticado
+        return redirect(url_for('main.dashboard'))  # Redirige al dashboard si está autenticado
+    return redirect(url_for('main.login'))  # Redirige al login si no está autenticado
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         user = Usuario.query.filter_by(username=username).first()
 
-        if user and user.check_password(password):
+        if user and autenticacion.verificar_password(user, password):
             login_user(user)
             flash(f"Bienvenido, {user.username}!", "success")
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('dashboard'))
+            return redirect(next_page) if next_page else redirect(url_for('main.dashboard'))
         else:
             flash("Usuario o contraseña incorrectos.", "danger")
 
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash("Sesión cerrada correctamente.", "info")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
     search = request.args.get('search', '').strip()  # Obtén el término de búsqueda
-    if search:
-        # Filtrar ventas por el nombre del producto asociado
-        ventas = Venta.query.join(Producto).filter(Producto.nombre.ilike(f'%{search}%')).all()
-    else:
-        # Mostrar todas las ventas si no hay búsqueda
-        ventas = Venta.query.all()
+    # Ventas paginadas por cursor, filtradas por el nombre del producto si hay búsqueda
+    ventas = paginar_ventas(search, request.args.get('cursor'), request.args.get('limite'))
 
-    productos = Producto.query.all()  # Mantén los productos para otras funcionalidades
-    return render_template('dashboard.html', ventas=ventas, productos=productos, active_page='dashboard')
+    productos = catalogo.productos()  # Catálogo en caché, sin consultar la base en cada carga
 
-@app.route('/agregar_producto', methods=['GET', 'POST'])
+    # Totales del día y del mes desde el resumen diario
+    hoy = datetime.utcnow().date()
+    total_hoy = agregaciones.ventas_de_hoy()
+    total_mes = agregaciones.total_ventas(desde=hoy.replace(day=1))
+    return render_template('dashboard.html', ventas=ventas, productos=productos, total_hoy=total_hoy,
+                           total_mes=total_mes, active_page='dashboard')
+
+@bp.route('/agregar_producto', methods=['GET', 'POST'])
 @login_required
 def agregar_producto():
     if request.method == 'POST':
         nombre = request.form['nombre']
         precio = round(float(request.form['precio']))  # Redondear el precio
         stock = int(request.form['stock'])
-        categoria_id = request.form.get('categoria_id')
+        categoria_id = request.form.get('categoria_id') or None  # '' = sin categoría
 
         if not nombre.strip():
             flash("El nombre del producto no puede estar vacío.", "danger")
             return redirect(request.url)
 
+        try:
+            umbral = leer_umbral(request.form.get('umbral_reposicion'))
+        except ValueError as e:
+            flash(str(e), "danger")
+            return redirect(request.url)
+
         nuevo_producto = Producto(
             nombre=nombre,
             precio=precio,  # Precio redondeado
             stock=stock,
-            categoria_id=categoria_id
+            categoria_id=categoria_id,
+            umbral_reposicion=umbral
         )
         db.session.add(nuevo_producto)
+        db.session.flush()
+        inventario.registrar_movimiento(nuevo_producto.id, stock, "Stock inicial")
         db.session.commit()
+        catalogo.invalidar()
         flash(f"Producto '{nombre}' agregado correctamente.", "success")
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
-    categorias = Categoria.query.all()
+    categorias = catalogo.categorias()
     return render_template('agregar_producto.html', categorias=categorias, active_page='agregar_producto')
 
-@app.route('/eliminar_producto/<int:producto_id>', methods=['POST'])
+@bp.route('/eliminar_producto/<int:producto_id>', methods=['POST'])
 @login_required
 def eliminar_producto(producto_id):
     producto = Producto.query.get_or_404(producto_id)
@@ -125,30 +201,32 @@ def eliminar_producto(producto_id):
     )
     db.session.add(producto_eliminado)
 
-    # Eliminar el producto de la base de datos
+    # Eliminar el producto de la base de datos (y sus ventas y movimientos archivados)
+    ventas = archivo.fuente(Venta)
+    venta_ids = db.session.scalars(select(ventas.id).where(ventas.producto_id == producto.id)).all()
+    archivo.borrar_producto(producto.id)
     db.session.delete(producto)
     db.session.commit()
+    catalogo.invalidar()
+    boletas.borrar(current_app.config['BOLETAS_FOLDER'], venta_ids)
 
     flash(f"Producto '{producto.nombre}' eliminado correctamente.", "success")
-    return redirect(url_for('reporte_stock'))
+    return redirect(url_for('main.reporte_stock'))
 
-@app.route('/ajustar_stock/<int:producto_id>', methods=['POST'])
+@bp.route('/ajustar_stock/<int:producto_id>', methods=['POST'])
 @login_required
 def ajustar_stock(producto_id):
     try:
         producto = Producto.query.get_or_404(producto_id)
         cantidad_a_reducir = int(request.form['cantidad'])
 
-        if cantidad_a_reducir > producto.stock:
+        # El descuento y el historial se confirman juntos en una sola transacción
+        if not inventario.descontar_stock(producto.id, cantidad_a_reducir, "Ajuste manual"):
+            db.session.rollback()
             flash(f"No puedes reducir más del stock disponible ({producto.stock}).", "danger")
         else:
-            producto.stock -= cantidad_a_reducir
-            db.session.add(HistorialStock(
-                producto_id=producto.id,
-                cantidad_cambiada=-cantidad_a_reducir,
-                motivo="Ajuste manual"
-            ))
             db.session.commit()
+            catalogo.invalidar()
             flash(f"Se redujo el stock de '{producto.nombre}' en {cantidad_a_reducir} unidades.", "success")
     except Exception as e:
         db.session.rollback()  # Revertir cambios si ocurre un error
@@ -156,23 +234,125 @@ def ajustar_stock(producto_id):
     finally:
         db.session.remove()  # Usa remove() en lugar de close() para evitar problemas de conexión
 
-    return redirect(url_for('reporte_stock'))
+    return redirect(url_for('main.reporte_stock'))
 
-@app.route('/reporte_bajo_stock')
+@bp.route('/reporte_bajo_stock')
 @login_required
 def reporte_bajo_stock():
-    umbral_stock = 5
-    productos_bajo_stock = Producto.query.filter(Producto.stock < umbral_stock).all()
-    return render_template('reporte_bajo_stock.html', productos=productos_bajo_stock, umbral_stock=umbral_stock)
+    # Lee las alertas abiertas (mantenidas en cada movimiento) en vez de recorrer los productos
+    productos_bajo_stock = alertas.consulta_alertas().all()
+    return render_template('reporte_bajo_stock.html', productos=productos_bajo_stock, umbral_stock=UMBRAL_STOCK_BAJO)
 
-@app.route('/historial_stock/<int:producto_id>')
+def dias_analitica():
+    # ?dias=N, uno de los períodos ofrecidos; por defecto ANALITICA_DIAS
+    dias = request.args.get('dias', type=int)
+    return dias if dias in analitica.PERIODOS else current_app.config['ANALITICA_DIAS']
+
+@bp.route('/reporte_analitica')
 @login_required
-def historial_stock(producto_id):
+def reporte_analitica():
+    resultado = analitica.analizar(dias_analitica())
+    # Primero los que ya están bajo el umbral sin ventas, después los que se agotan antes
+    reponer = sorted((producto for producto in resultado['productos'] if producto['reponer']),
+                     key=lambda producto: (producto['dias_de_stock'] is not None, producto['dias_de_stock'] or 0))
+    return render_template('reporte_analitica.html', analitica=resultado, mas_vendidos=resultado['productos'][:20],
+                           reponer=reponer, periodos=analitica.PERIODOS)
+
+@bp.route('/analitica/ventas')
+@login_required
+def analitica_ventas():
+    # El mismo cálculo en JSON, para planillas de compras u otras herramientas
+    return jsonify(analitica.analizar(dias_analitica()))
+
+def leer_umbral(valor):
+    # Umbral de reposición de un formulario: vacío = heredado (categoría o valor por defecto)
+    if valor is None or not valor.strip():
+        return None
+    try:
+        umbral = int(valor)
+    except ValueError:
+        raise ValueError("El umbral de reposición debe ser un número entero.")
+    if umbral < 0:
+        raise ValueError("El umbral de reposición no puede ser negativo.")
+    return umbral
+
+@bp.route('/umbral_reposicion/<int:producto_id>', methods=['POST'])
+@login_required
+def umbral_producto(producto_id):
     producto = Producto.query.get_or_404(producto_id)
-    historial = HistorialStock.query.filter_by(producto_id=producto_id).all()
-    return render_template('historial_stock.html', producto=producto, historial=historial)
+    try:
+        producto.umbral_reposicion = leer_umbral(request.form.get('umbral_reposicion'))
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(request.referrer or url_for('main.reporte_bajo_stock'))
+    db.session.flush()
+    alertas.revisar([producto.id])
+    db.session.commit()
+    flash(f"Umbral de reposición de '{producto.nombre}' actualizado.", "success")
+    return redirect(request.referrer or url_for('main.reporte_bajo_stock'))
 
-@app.route('/cargar_productos', methods=['GET', 'POST'])
+@bp.route('/umbral_categoria/<int:categoria_id>', methods=['POST'])
+@login_required
+def umbral_categoria(categoria_id):
+    categoria = Categoria.query.get_or_404(categoria_id)
+    try:
+        categoria.umbral_reposicion = leer_umbral(request.form.get('umbral_reposicion'))
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('main.agregar_categoria'))
+    db.session.flush()
+    alertas.revisar_categoria(categoria.id)
+    db.session.commit()
+    flash(f"Umbral de reposición de la categoría '{categoria.nombre}' actualizado.", "success")
+    return redirect(url_for('main.agregar_categoria'))
+
+@bp.route('/alertas/cantidad')
+@login_required
+def cantidad_alertas():
+    # Consulta mínima para el contador de la barra de navegación
+    return jsonify(activas=alertas.contar())
+
+@bp.route('/alertas/stream')
+@login_required
+def stream_alertas():
+    # Server-Sent Events: cada alerta abierta o cerrada se envía a los navegadores conectados.
+    # Cada conexión ocupa un hilo del worker, por eso solo el dashboard la abre (ver base.html);
+    # las demás páginas consultan /alertas/cantidad. Con muchos dashboards conviene el worker gevent.
+    def eventos():
+        yield f"event: cantidad\ndata: {json.dumps({'activas': alertas.contar()})}\n\n"
+        db.session.remove()  # No retener una conexión del pool mientras se espera
+        for evento in alertas.escuchar():
+            if evento is None:
+                yield ": ping\n\n"  # Mantiene viva la conexión y detecta clientes desconectados
+            else:
+                yield f"event: alerta\ndata: {json.dumps(evento)}\n\n"
+
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def rango_fechas():
+    # Lee ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD; ambos días se incluyen, así que el
+    # límite superior exclusivo es el día siguiente a `hasta`
+    try:
+        desde = datetime.strptime(request.args['desde'], '%Y-%m-%d') if request.args.get('desde') else None
+        hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d') if request.args.get('hasta') else None
+    except ValueError:
+        flash("Las fechas deben tener el formato AAAA-MM-DD.", "warning")
+        return None, None
+    return desde, hasta + timedelta(days=1) if hasta else None
+
+@bp.route('/historial_stock/<int:producto_id>')
+@login_required
+def historial_stock(producto_id):
+    producto = Producto.query.get_or_404(producto_id)
+    desde, hasta = rango_fechas()
+    # Movimientos paginados por cursor y, si hay rango, el stock al cierre del último día
+    historial = paginar_historial(producto_id, desde, hasta, request.args.get('cursor'), request.args.get('limite'))
+    stock_al_cierre = inventario.stock_en(producto_id, hasta) if hasta else None
+    return render_template('historial_stock.html', producto=producto, historial=historial,
+                           stock_al_cierre=stock_al_cierre)
+
+@bp.route('/cargar_productos', methods=['GET', 'POST'])
 @login_required
 def cargar_productos():
     if request.method == 'POST':
@@ -180,154 +360,223 @@ def cargar_productos():
             flash("No se seleccionó ningún archivo.", "danger")
             return redirect(request.url)
 
-        archivo = request.files['archivo']
-        if archivo.filename == '':
+        subido = request.files['archivo']
+        if subido.filename == '':
             flash("El archivo no tiene un nombre válido.", "danger")
             return redirect(request.url)
 
-        if not archivo.filename.endswith('.xlsx'):
-            flash("El archivo debe ser un archivo Excel con extensión .xlsx.", "danger")
+        if not subido.filename.lower().endswith(('.xlsx', '.csv')):
+            flash("El archivo debe ser un Excel (.xlsx) o un CSV (.csv).", "danger")
             return redirect(request.url)
 
-        filename = secure_filename(archivo.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        archivo.save(filepath)
+        filename = secure_filename(subido.filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        subido.save(filepath)
 
         try:
-            # Leer el archivo Excel
-            df = pd.read_excel(filepath)
-
-            # Validar que las columnas requeridas estén presentes
-            columnas_requeridas = {'nombre', 'precio', 'stock'}
-            if not columnas_requeridas.issubset(df.columns):
-                flash(f"El archivo Excel debe contener las columnas: {', '.join(columnas_requeridas)}.", "danger")
-                return redirect(request.url)
-
-            # Insertar productos en la base de datos
-            for _, row in df.iterrows():
-                producto = Producto(
-                    nombre=row['nombre'],
-                    precio=round(row['precio']),  # Redondear el precio
-                    stock=row['stock']
-                )
-                db.session.add(producto)
-
-            db.session.commit()
-            flash("Productos cargados exitosamente desde el archivo Excel.", "success")
+            # Lectura por lotes con inserción/actualización masiva por nombre de producto
+            resultado = importador.importar_productos(filepath)
+            catalogo.invalidar()
         except Exception as e:
+            db.session.rollback()
             flash(f"Error al procesar el archivo: {e}", "danger")
+            return redirect(request.url)
         finally:
             # Eliminar el archivo subido después de procesarlo
             if os.path.exists(filepath):
                 os.remove(filepath)
 
-        return redirect(url_for('dashboard'))
+        flash(f"Productos cargados: {resultado.insertados} nuevos, {resultado.actualizados} actualizados.", "success")
+        if resultado.errores:
+            flash(f"Se omitieron {len(resultado.errores)} filas con errores.", "warning")
+            return render_template('cargar_productos.html', errores=resultado.errores[:500],
+                                   total_errores=len(resultado.errores))
+
+        return redirect(url_for('main.dashboard'))
 
     return render_template('cargar_productos.html')
 
-@app.route('/emitir_boleta/<int:venta_id>')
+@bp.route('/emitir_boleta/<int:venta_id>')
 @login_required
 def emitir_boleta(venta_id):
-    venta = Venta.query.get_or_404(venta_id)
-    producto = Producto.query.get_or_404(venta.producto_id)
+    return boletas.enviar_boleta(venta_id)
 
-    rendered = render_template('boleta.html', venta=venta, producto=producto)
-    output_folder = os.path.join(os.getcwd(), 'generated_boletas')
-    os.makedirs(output_folder, exist_ok=True)
-    pdf_path = os.path.join(output_folder, f'boleta_{venta.id}.pdf')
-
-    with open(pdf_path, 'wb') as pdf_file:
-        pisa.CreatePDF(BytesIO(rendered.encode("UTF-8")), dest=pdf_file)
-
-    return send_file(pdf_path, as_attachment=True, download_name=f'boleta_{venta.id}.pdf')
-
-@app.route('/generar_pdf/<int:venta_id>')
+@bp.route('/generar_pdf/<int:venta_id>')
 @login_required
 def generar_pdf(venta_id):
-    venta = Venta.query.get_or_404(venta_id)
-    producto = Producto.query.get_or_404(venta.producto_id)
-
-    rendered = render_template('boleta.html', venta=venta, producto=producto)
-    output_folder = os.path.join(os.getcwd(), 'generated_boletas')
-    os.makedirs(output_folder, exist_ok=True)
-    pdf_path = os.path.join(output_folder, f'boleta_{venta.id}.pdf')
+    return boletas.enviar_boleta(venta_id)
 
-    with open(pdf_path, 'wb') as pdf_file:
-        pisa.CreatePDF(BytesIO(rendered.encode("UTF-8")), dest=pdf_file)
-
-    return send_file(pdf_path, as_attachment=True, download_name=f'boleta_{venta.id}.pdf')
-
-@app.route('/ventas')
+@bp.route('/ventas')
 @login_required
 def ventas():
     search = request.args.get('search', '').strip()  # Obtén el término de búsqueda
     if search:
         # Filtrar productos disponibles por nombre que contengan el término de búsqueda
-        productos = Producto.query.filter(Producto.stock > 0, Producto.nombre.ilike(f'%{search}%')).all()
+        productos = Producto.query.filter(Producto.stock > 0, busqueda.filtro_nombre(search)).all()
     else:
         # Mostrar solo los productos disponibles si no hay búsqueda
-        productos = Producto.query.filter(Producto.stock > 0).all()
+        productos = catalogo.productos_con_stock()
 
-    ventas = Venta.query.all()
+    ventas = paginar_ventas(cursor=request.args.get('cursor'), limite=request.args.get('limite'))
     return render_template('ventas.html', ventas=ventas, productos=productos, active_page='ventas')
 
 
-@app.route('/vender/<int:producto_id>', methods=['POST'])
+@bp.route('/productos/buscar')
+@login_required
+def buscar_productos():
+    # Autocompletado: productos que coinciden con lo escrito, ordenados por relevancia
+    termino = request.args.get('q', '').strip()
+    limite = request.args.get('limite', 10, type=int)
+    solo_con_stock = request.args.get('con_stock') == '1'
+    productos = busqueda.buscar_productos(termino, limite, solo_con_stock) if termino else []
+    return jsonify([
+        {'id': p.id, 'nombre': p.nombre, 'precio': p.precio, 'stock': p.stock} for p in productos
+    ])
+
+@bp.route('/vender/<int:producto_id>', methods=['POST'])
 @login_required
 def vender(producto_id):
     producto = Producto.query.get_or_404(producto_id)
     cantidad = int(request.form['cantidad'])
 
-    if cantidad > producto.stock:
+    if cantidad <= 0:
+        flash("La cantidad debe ser mayor a 0.", "danger")
+    elif not inventario.descontar_stock(producto.id, cantidad, "Venta"):
+        # Otra caja pudo haber vendido el stock restante entre la lectura y el UPDATE
+        db.session.rollback()
         flash(f"No hay suficiente stock para vender {cantidad} unidades de '{producto.nombre}'.", "danger")
     else:
-        producto.stock -= cantidad
-        venta = Venta(producto_id=producto.id, cantidad=cantidad)
+        # Se guarda el precio vigente para que cambios futuros no alteren la venta
+        venta = Venta(
+            producto_id=producto.id,
+            cantidad=cantidad,
+            precio_unitario=producto.precio,
+            total=cantidad * producto.precio
+        )
         db.session.add(venta)
+        resumen_diario.registrar_venta(venta, producto)
         db.session.commit()
+        catalogo.invalidar()
         flash(f"Se vendieron {cantidad} unidades de '{producto.nombre}'.", "success")
 
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
-@app.route('/reporte_ventas')
+@bp.route('/checkout', methods=['POST'])
+@login_required
+def checkout():
+    # Recibe {"lineas": [{"producto_id": 1, "cantidad": 2}, ...]} y cobra todo en una transacción
+    datos = request.get_json(silent=True) or {}
+    try:
+        boleta = caja.cobrar_y_confirmar(datos.get('lineas'))
+    except caja.StockInsuficiente as e:
+        return jsonify(error=str(e), productos=e.como_json()), 409
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    return jsonify(boleta), 201
+
+@bp.route('/reporte_ventas')
 @login_required
 def reporte_ventas():
-    ventas = Venta.query.all()
-    total_ventas = sum(venta.cantidad * venta.producto.precio for venta in ventas if venta.producto)
-    return render_template('reporte_ventas.html', ventas=ventas, total_ventas=total_ventas)
+    desde, hasta = rango_fechas()
+    # Totales calculados en SQL, sin cargar las ventas en memoria; los días cerrados salen del resumen diario
+    total_ventas = agregaciones.total_ventas(desde, hasta)
+    ventas_por_categoria = agregaciones.ventas_por_categoria(desde, hasta)
+    if desde or hasta:
+        # Con rango de fechas se resume por producto en vez de listar venta por venta
+        ventas, ventas_por_producto = None, agregaciones.ventas_por_producto(desde, hasta)
+    else:
+        ventas, ventas_por_producto = paginar_ventas(cursor=request.args.get('cursor'), limite=request.args.get('limite')), None
+    return render_template('reporte_ventas.html', ventas=ventas, ventas_por_producto=ventas_por_producto,
+                           total_ventas=total_ventas, ventas_por_categoria=ventas_por_categoria)
 
-@app.route('/reporte_stock')
+@bp.route('/reporte_stock')
 @login_required
 def reporte_stock():
-    productos = Producto.query.all()
-    # Convertir precios a enteros
-    for producto in productos:
-        producto.precio = int(producto.precio)
-    return render_template('reporte_stock.html', productos=productos)
+    desde, hasta = rango_fechas()
+    if hasta:
+        # Stock valorizado al cierre de `hasta`, leído del corte nocturno de ese día
+        productos = db.session.execute(inventario.consulta_valuacion(hasta)).all()
+    else:
+        productos = catalogo.productos()  # La plantilla muestra los precios como enteros
+    stock_inicial = None
+    if desde:
+        inicial = inventario.consulta_valuacion(desde).subquery()
+        stock_inicial = dict(db.session.execute(select(inicial.c.id, inicial.c.stock)).all())
+    return render_template('reporte_stock.html', productos=productos, stock_inicial=stock_inicial,
+                           historico=hasta is not None)
+
+def encolar_pdf(rendered, nombre_descarga):
+    # Encola la conversión a PDF y lleva al usuario a la página de espera
+    with metricas.medir('segundos_pdf'):
+        trabajo_id = trabajos.encolar(rendered, current_app.config['TRABAJOS_FOLDER'], nombre_descarga, current_app.config['PDF_WORKERS'])
+    return redirect(url_for('main.ver_trabajo', trabajo_id=trabajo_id))
+
+@bp.route('/trabajos/<trabajo_id>')
+@login_required
+def ver_trabajo(trabajo_id):
+    trabajo = trabajos.estado(current_app.config['TRABAJOS_FOLDER'], trabajo_id)
+    if trabajo is None:
+        abort(404)
+    return render_template('trabajo.html', trabajo=trabajo, trabajo_id=trabajo_id)
 
-@app.route('/generar_pdf_reporte_ventas')
+@bp.route('/trabajos/<trabajo_id>/estado')
+@login_required
+def estado_trabajo(trabajo_id):
+    trabajo = trabajos.estado(current_app.config['TRABAJOS_FOLDER'], trabajo_id)
+    if trabajo is None:
+        return jsonify(error="Trabajo no encontrado."), 404
+    respuesta = {'id': trabajo_id, 'estado': trabajo['estado'], 'nombre': trabajo['nombre']}
+    if trabajo['estado'] == 'listo':
+        respuesta['descarga'] = url_for('main.descargar_trabajo', trabajo_id=trabajo_id)
+    elif trabajo['estado'] == 'error':
+        respuesta['error'] = trabajo['error']
+    return jsonify(respuesta)
+
+@bp.route('/trabajos/<trabajo_id>/descargar')
+@login_required
+def descargar_trabajo(trabajo_id):
+    trabajo = trabajos.estado(current_app.config['TRABAJOS_FOLDER'], trabajo_id)
+    if trabajo is None or trabajo['estado'] != 'listo':
+        abort(404)
+    return send_file(trabajo['ruta'], as_attachment=True, download_name=trabajo['nombre'])
+
+def encolar_reporte_pdf(reporte, nombre_descarga):
+    # Reportes largos: se arman por tramos que se convierten en paralelo y se unen en un solo PDF
+    desde, hasta = rango_fechas()
+    with metricas.medir('segundos_pdf'):
+        trabajo_id = reportes_pdf.encolar(reporte, nombre_descarga, desde, hasta)
+    return redirect(url_for('main.ver_trabajo', trabajo_id=trabajo_id))
+
+@bp.route('/generar_pdf_reporte_ventas')
 @login_required
 def generar_pdf_reporte_ventas():
-    ventas = Venta.query.all()
-    total_ventas = sum(venta.cantidad * venta.producto.precio for venta in ventas if venta.producto)
-    rendered = render_template('reporte_ventas_pdf.html', ventas=ventas, total_ventas=total_ventas)
-    pdf = BytesIO()
-    pisa.CreatePDF(BytesIO(rendered.encode("UTF-8")), dest=pdf)
-    pdf.seek(0)
-    return send_file(pdf, as_attachment=True, download_name='reporte_ventas.pdf')
+    # El PDF se arma con el resumen diario, sin recorrer venta por venta
+    return encolar_reporte_pdf('ventas', 'reporte_ventas.pdf')
 
-@app.route('/generar_pdf_reporte_stock')
+@bp.route('/generar_pdf_reporte_stock')
 @login_required
 def generar_pdf_reporte_stock():
-    productos = Producto.query.all()
-    now = datetime.now()
-    rendered = render_template('reporte_stock_pdf.html', productos=productos, now=now)
-    pdf = BytesIO()
-    pisa.CreatePDF(BytesIO(rendered.encode("UTF-8")), dest=pdf)
-    pdf.seek(0)
-    return send_file(pdf, as_attachment=True, download_name='reporte_stock.pdf')
+    return encolar_reporte_pdf('stock', 'reporte_stock.pdf')
+
+@bp.route('/exportar/<reporte>.<formato>')
+@login_required
+def exportar(reporte, formato):
+    # Exporta ventas, stock o productos eliminados leyendo la base de datos por tandas
+    if reporte not in exportaciones.REPORTES or formato not in ('csv', 'xlsx'):
+        abort(404)
+
+    nombre = f'{reporte}_{datetime.now():%Y%m%d}.{formato}'
+    if formato == 'csv':
+        return Response(
+            stream_with_context(exportaciones.generar_csv(reporte)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={nombre}'}
+        )
+    return send_file(exportaciones.generar_xlsx(reporte), as_attachment=True, download_name=nombre,
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
-@app.route('/agregar_categoria', methods=['GET', 'POST'])
+@bp.route('/agregar_categoria', methods=['GET', 'POST'])
 @login_required
 def agregar_categoria():
     if request.method == 'POST':
@@ -341,37 +590,115 @@ def agregar_categoria():
             flash("La categoría ya existe.", "warning")
             return redirect(request.url)
 
-        nueva_categoria = Categoria(nombre=nombre)
+        try:
+            umbral = leer_umbral(request.form.get('umbral_reposicion'))
+        except ValueError as e:
+            flash(str(e), "danger")
+            return redirect(request.url)
+
+        nueva_categoria = Categoria(nombre=nombre, umbral_reposicion=umbral)
         db.session.add(nueva_categoria)
         db.session.commit()
+        catalogo.invalidar()
         flash(f"Categoría '{nombre}' agregada correctamente.", "success")
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
-    return render_template('agregar_categoria.html')
+    categorias = Categoria.query.order_by(Categoria.nombre).all()
+    return render_template('agregar_categoria.html', categorias=categorias, umbral_defecto=UMBRAL_STOCK_BAJO)
 
-@app.route('/productos_eliminados')
+@bp.route('/productos_eliminados')
 @login_required
 def productos_eliminados():
     productos = ProductoEliminado.query.all()
     return render_template('productos_eliminados.html', productos=productos)
 
-@app.route('/generar_pdf_productos_eliminados')
+@bp.route('/generar_pdf_productos_eliminados')
 @login_required
 def generar_pdf_productos_eliminados():
     productos_eliminados = ProductoEliminado.query.all()
     now = datetime.now()
     rendered = render_template('productos_eliminados_pdf.html', productos=productos_eliminados, now=now)
-    pdf = BytesIO()
-    pisa.CreatePDF(BytesIO(rendered.encode("UTF-8")), dest=pdf)
-    pdf.seek(0)
-    return send_file(pdf, as_attachment=True, download_name='productos_eliminados.pdf')
+    return encolar_pdf(rendered, 'productos_eliminados.pdf')
+
+@bp.route('/metrics')
+@login_required
+def ver_metricas():
+    if current_user.username not in current_app.config['ADMINISTRADORES']:
+        abort(403)
+    if not current_app.config['METRICAS_HABILITADAS']:
+        abort(404)
+    return Response(metricas.formato_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@bp.cli.command('reconstruir-resumen')
+def reconstruir_resumen():
+    """Regenera el resumen diario de ventas a partir de la tabla venta."""
+    filas = resumen_diario.reconstruir()
+    print(f"Resumen diario reconstruido: {filas} filas.")
+
+@bp.cli.command('cortar-stock')
+@click.option('--fecha', type=click.DateTime(formats=['%Y-%m-%d']),
+              help="Día a cortar (AAAA-MM-DD); por defecto, hoy. El corte es el stock al inicio del día.")
+def cortar_stock(fecha):
+    """Guarda el stock valorizado de cada producto al inicio del día (UTC); para cron a medianoche."""
+    cortes = programador.ejecutar_corte(fecha)
+    print(f"Cortes de stock creados: {cortes}.")
+
+@bp.cli.command('verificar-indices')
+def verificar_indices():
+    """Falla si alguna consulta crítica recorre su tabla completa (EXPLAIN QUERY PLAN)."""
+    if db.engine.dialect.name != 'sqlite':
+        print("La verificación de planes solo está disponible para SQLite.")
+        return
+    fallas = indices.verificar_planes()
+    for nombre, plan in fallas:
+        print(f"[FALLA] {nombre}: {' | '.join(plan)}")
+    if fallas:
+        raise SystemExit(1)
+    print(f"Planes correctos: {len(indices.CONSULTAS_CRITICAS)} consultas usan índices.")
+
+@bp.cli.command('copiar-datos')
+@click.argument('destino')
+@click.option('--origen', help="URL de la base de origen (por defecto, la configurada).")
+@click.option('--vaciar', is_flag=True, help="Borra los datos que ya existan en el destino.")
+@click.option('--lote', default=migrador.FILAS_POR_LOTE, show_default=True, help="Filas por lote.")
+def copiar_datos(destino, origen, vaciar, lote):
+    """Copia todos los datos a otra base (p. ej. de SQLite a PostgreSQL)."""
+    origen = origen or db.engine.url.render_as_string(hide_password=False)
+    try:
+        copiadas = migrador.copiar(origen, destino, vaciar=vaciar, filas_por_lote=lote)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Copia terminada: {sum(copiadas.values())} filas en {len(copiadas)} tablas.")
+
+@bp.cli.command('generar-datos')
+@click.option('--productos', default=1000, show_default=True)
+@click.option('--categorias', default=20, show_default=True)
+@click.option('--ventas', default=50000, show_default=True)
+@click.option('--dias', default=365, show_default=True, help="Días hacia atrás en los que se reparten las ventas.")
+@click.option('--semilla', default=42, show_default=True, help="La misma semilla genera los mismos datos.")
+def generar_datos(productos, categorias, ventas, dias, semilla):
+    """Llena una base vacía con datos sintéticos para benchmarks y pruebas de carga."""
+    try:
+        creadas = datos_sinteticos.generar(productos, categorias, ventas, dias, semilla)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Datos generados: {sum(creadas.values())} filas en {db.engine.url.render_as_string()}.")
+
+@bp.cli.command('archivar')
+@click.option('--antes-de', 'antes_de', type=click.DateTime(formats=['%Y-%m-%d']),
+              help="Archiva lo anterior a este día (AAAA-MM-DD); por defecto, según ARCHIVO_MESES.")
+def archivar(antes_de):
+    """Mueve las ventas y movimientos de stock antiguos a las tablas de archivo por año."""
+    antes_de = antes_de or archivo.fecha_horizonte(current_app.config['ARCHIVO_MESES'])
+    try:
+        movidas = archivo.archivar(antes_de)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Archivo al {antes_de:%d/%m/%Y}: {sum(movidas.values())} filas en {len(movidas)} tablas.")
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
-        # Configurar SQLite para acceso concurrente
-        with db.engine.connect() as connection:
-            connection.execute(text("PRAGMA journal_mode=WAL"))
-
         # Código para inicializar datos
         if not Usuario.query.filter_by(username="admin").first():
             usuario = Usuario(username="admin")
@@ -379,4 +706,5 @@ if __name__ == '__main__':
             db.session.add(usuario)
             db.session.commit()
 
-    app.run(debug=True)
\ No newline at end of file
+    # Servidor de desarrollo; en producción usar wsgi.py con gunicorn o waitress
+    app.run(debug=app.config['DEBUG'], threaded=True)
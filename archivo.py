@@ -0,0 +1,176 @@
+import threading
+from datetime import datetime
+
+from flask import g
+from sqlalchemy import Column, Index, MetaData, Table, and_, delete, extract, insert, select, union_all
+from sqlalchemy.orm import aliased
+
+from models import db, Venta, HistorialStock, ArchivoHistorico
+import programador
+
+# Archivo de ventas y movimientos de stock antiguos. Las filas con fecha
+# anterior al horizonte (ARCHIVO_MESES) se mueven a una tabla por origen y año
+# (venta_archivo_2023, historial_stock_archivo_2023) en la misma base, y venta
+# e historial_stock quedan solo con los meses recientes que leen la caja, los
+# listados y los reportes del día a día. venta_resumen_diario no se toca, así
+# que los reportes de días cerrados no cambian; antes de mover el historial se
+# guarda un corte de stock en la fecha límite, de modo que el stock posterior a
+# ella se calcula sin leer el archivo.
+#
+# Las consultas que llegan antes de la fecha límite leen el archivo sin que
+# quien llama lo note:
+#   entidades(modelo, desde, hasta)  el modelo y sus tablas de archivo, de la más
+#                                    nueva a la más antigua (listados por cursor)
+#   fuente(modelo, desde, hasta)     el modelo sobre un UNION ALL con el archivo
+#                                    (consultas por conjunto: sumas, exportaciones)
+#
+# Las tablas de archivo no tienen claves foráneas ni están en las migraciones:
+# se crean al archivar y quedan registradas en archivo_historico. Se archiva
+# desde cron con `flask archivar`.
+
+MODELOS = (Venta, HistorialStock)
+
+_metadata = MetaData()
+_bloqueo = threading.Lock()
+
+
+def nombre_tabla(modelo, anio):
+    return f"{modelo.__tablename__}_archivo_{anio}"
+
+
+def tabla(modelo, anio):
+    """Tabla de archivo de `modelo` para `anio`: las mismas columnas, sin claves foráneas."""
+    nombre = nombre_tabla(modelo, anio)
+    with _bloqueo:
+        if nombre not in _metadata.tables:
+            columnas = [Column(columna.name, columna.type, primary_key=columna.primary_key,
+                               nullable=columna.nullable, autoincrement=False)
+                        for columna in modelo.__table__.columns]
+            Table(nombre, _metadata, *columnas,
+                  Index(f'ix_{nombre}_fecha_id', 'fecha', 'id'),
+                  Index(f'ix_{nombre}_producto_fecha', 'producto_id', 'fecha'))
+        return _metadata.tables[nombre]
+
+
+def _registro():
+    # archivo_historico se lee una vez por petición (o por comando)
+    if '_archivo_registro' not in g:
+        g._archivo_registro = db.session.execute(
+            select(ArchivoHistorico.tabla, ArchivoHistorico.anio, ArchivoHistorico.hasta)
+            .order_by(ArchivoHistorico.anio.desc())
+        ).all()
+    return g._archivo_registro
+
+
+def limite(modelo):
+    """Fecha hasta la que se archivó `modelo` (exclusiva), o None si no tiene archivo."""
+    fechas = [fila.hasta for fila in _registro() if fila.tabla == modelo.__tablename__]
+    return max(fechas) if fechas else None
+
+
+def tablas(modelo, desde=None, hasta=None):
+    """Tablas de archivo de `modelo` que pueden tener filas en [desde, hasta), de la más nueva a la más antigua."""
+    fin = limite(modelo)
+    if fin is None or (desde is not None and desde >= fin):
+        return []
+    return [
+        tabla(modelo, fila.anio)
+        for fila in _registro()
+        if fila.tabla == modelo.__tablename__
+        and (desde is None or fila.anio >= desde.year)
+        and (hasta is None or fila.anio <= hasta.year)
+    ]
+
+
+def entidades(modelo, desde=None, hasta=None):
+    """El modelo seguido de sus tablas de archivo en [desde, hasta), cada una mapeada como el modelo."""
+    return [modelo] + [aliased(modelo, archivada, adapt_on_names=True) for archivada in tablas(modelo, desde, hasta)]
+
+
+def fuente(modelo, desde=None, hasta=None):
+    """El modelo, o un alias del modelo sobre el UNION ALL con su archivo si [desde, hasta) lo alcanza."""
+    archivadas = tablas(modelo, desde, hasta)
+    if not archivadas:
+        return modelo
+    todas = union_all(select(modelo.__table__), *[select(archivada) for archivada in archivadas])
+    return aliased(modelo, todas.subquery(f'{modelo.__tablename__}_completo'), adapt_on_names=True)
+
+
+def obtener(modelo, id_):
+    """Fila de `modelo` por id, de la tabla activa o del archivo; None si no existe."""
+    objeto = db.session.get(modelo, id_)
+    if objeto is None:
+        for entidad in entidades(modelo)[1:]:
+            objeto = db.session.scalars(select(entidad).where(entidad.id == id_)).first()
+            if objeto is not None:
+                break
+    return objeto
+
+
+def borrar_producto(producto_id):
+    """Borra las filas archivadas de un producto; quien llama hace el commit."""
+    for modelo in MODELOS:
+        for archivada in tablas(modelo):
+            db.session.execute(delete(archivada).where(archivada.c.producto_id == producto_id))
+
+
+def tablas_en(conexion):
+    """Tablas de archivo registradas en la base de `conexion` (para copiarla a otro motor)."""
+    modelos = {modelo.__tablename__: modelo for modelo in MODELOS}
+    filas = conexion.execute(select(ArchivoHistorico.tabla, ArchivoHistorico.anio).order_by(ArchivoHistorico.id))
+    return [tabla(modelos[fila.tabla], fila.anio) for fila in filas]
+
+
+def fecha_horizonte(meses, hoy=None):
+    """Primer día del mes `meses` meses antes del mes de `hoy`: lo anterior se archiva."""
+    hoy = hoy or datetime.utcnow()
+    indice = hoy.year * 12 + hoy.month - 1 - meses
+    return datetime(indice // 12, indice % 12 + 1, 1)
+
+
+def archivar(anterior_a, informar=print):
+    """Mueve al archivo las ventas y movimientos con fecha anterior a `anterior_a`.
+
+    Cada año de cada tabla se mueve en su propia transacción (INSERT ... SELECT
+    y DELETE), así que si el proceso se corta las filas quedan de un lado o del
+    otro, nunca en los dos. Devuelve {tabla de archivo: filas movidas}.
+    """
+    anterior_a = datetime(anterior_a.year, anterior_a.month, anterior_a.day)
+    ahora = datetime.utcnow()
+    if anterior_a > datetime(ahora.year, ahora.month, ahora.day):
+        raise ValueError("Solo se pueden archivar días cerrados.")
+
+    # Corte en la fecha límite: el stock posterior a ella no necesita el historial archivado
+    programador.ejecutar_corte(anterior_a)
+
+    movidas = {}
+    for modelo in MODELOS:
+        origen = modelo.__table__
+        columna_anio = extract('year', origen.c.fecha)
+        anios = db.session.scalars(
+            select(columna_anio).where(origen.c.fecha < anterior_a).distinct().order_by(columna_anio)
+        ).all()
+        for anio in map(int, anios):
+            destino = tabla(modelo, anio)
+            destino.create(db.session.connection(), checkfirst=True)
+            filtro = and_(origen.c.fecha >= datetime(anio, 1, 1),
+                          origen.c.fecha < min(datetime(anio + 1, 1, 1), anterior_a))
+            filas = db.session.execute(
+                insert(destino).from_select([columna.name for columna in origen.columns],
+                                            select(origen).where(filtro))
+            ).rowcount
+            db.session.execute(delete(origen).where(filtro))
+
+            registro = ArchivoHistorico.query.filter_by(tabla=modelo.__tablename__, anio=anio).first()
+            if registro is None:
+                registro = ArchivoHistorico(tabla=modelo.__tablename__, anio=anio, filas=0, hasta=anterior_a)
+                db.session.add(registro)
+            registro.filas += filas
+            registro.hasta = max(registro.hasta, anterior_a)
+            db.session.commit()
+
+            movidas[destino.name] = filas
+            informar(f"{destino.name}: {filas} filas archivadas.")
+
+    g.pop('_archivo_registro', None)
+    return movidas
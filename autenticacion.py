@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from werkzeug.security import generate_password_hash
+
+from models import db, Usuario
+from catalogo import CacheLocal, CacheRedis
+
+# Autenticación barata por petición: Flask-Login llama al cargador de usuario en
+# cada petición autenticada, así que los datos de la sesión (id y username) se
+# guardan en una caché de vida corta en lugar de consultar la tabla usuario.
+# Cualquier cambio o borrado de un Usuario invalida su entrada.
+
+PREFIJO = 'veterinaria:usuario:'
+
+_config = {'backend': CacheLocal(max_entradas=1024), 'ttl': 30}
+
+
+class UsuarioSesion(UserMixin):
+    """Usuario autenticado de la petición; no es un objeto del ORM."""
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+def init_app(app):
+    _config['ttl'] = app.config.get('USUARIOS_CACHE_TTL', 30)
+    url = app.config.get('CACHE_URL')
+    _config['backend'] = CacheRedis(url) if url else CacheLocal(max_entradas=1024)
+
+
+def cargar_usuario(user_id):
+    """Cargador para login_manager.user_loader."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    clave = f'{PREFIJO}{user_id}'
+    datos = _config['backend'].obtener(clave)
+    if datos is None:
+        fila = db.session.execute(select(Usuario.id, Usuario.username).where(Usuario.id == user_id)).first()
+        if fila is None:
+            return None
+        datos = {'id': fila.id, 'username': fila.username}
+        _config['backend'].guardar(clave, datos, _config['ttl'])
+    return UsuarioSesion(datos['id'], datos['username'])
+
+
+def invalidar_usuario(user_id):
+    _config['backend'].borrar(f'{PREFIJO}{user_id}')
+
+
+def _usuario_modificado(mapper, conexion, usuario):
+    invalidar_usuario(usuario.id)
+
+
+event.listen(Usuario, 'after_update', _usuario_modificado)
+event.listen(Usuario, 'after_delete', _usuario_modificado)
+
+
+@lru_cache(maxsize=None)
+def _prefijo_hash(metodo):
+    # werkzeug guarda el método con sus parámetros ("scrypt" -> "scrypt:32768:8:1")
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def verificar_password(usuario, password):
+    """Comprueba la contraseña y, si el hash usa otros parámetros que los configurados, lo regenera."""
+    if not usuario.check_password(password):
+        return False
+
+    metodo = current_app.config.get('PASSWORD_HASH_METODO', 'scrypt')
+    if usuario.password_hash.split('$', 1)[0] != _prefijo_hash(metodo):
+        usuario.set_password(password, metodo)
+        db.session.commit()
+    return True
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from flask import render_template
+
+import boletas
+import reportes_pdf
+import trabajos
+from models import db, Venta
+
+# Generación de PDF esperando el resultado. Las rutas /generar_pdf_* encolan
+# el trabajo y responden de inmediato, así que medirlas no diría nada.
+
+
+@pytest.fixture
+def ruta_pdf(tmp_path):
+    return os.path.join(tmp_path, 'benchmark.pdf')
+
+
+@pytest.mark.benchmark(group='pdf')
+@pytest.mark.parametrize('motor', ['xhtml2pdf', 'reportlab'])
+@pytest.mark.parametrize('reporte', ['stock', 'ventas'])
+def test_pdf_reporte(benchmark, app, ruta_pdf, reporte, motor):
+    # Por tramos en el pool de procesos, como lo encola la ruta /generar_pdf_reporte_*
+    with app.app_context():
+        benchmark.pedantic(reportes_pdf.generar, args=(reporte, ruta_pdf, motor), rounds=3, iterations=1)
+
+
+@pytest.mark.benchmark(group='pdf')
+def test_pdf_boleta(benchmark, app, ruta_pdf):
+    with app.test_request_context():
+        venta = db.session.get(Venta, 1)
+        html = render_template(boletas.PLANTILLA, venta=venta, producto=venta.producto)
+    benchmark(trabajos.generar_pdf, html, ruta_pdf)
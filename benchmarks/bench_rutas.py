@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import analitica
+
+# Rutas de consulta con el cliente de pruebas de Flask: cada ronda es una
+# petición completa (sesión, consultas, plantilla), sin servidor HTTP.
+
+
+def _get(cliente, url):
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200, (url, respuesta.status_code)
+    respuesta.get_data()  # Consume también las respuestas en streaming
+    respuesta.close()
+
+
+@pytest.mark.benchmark(group='paginas')
+@pytest.mark.parametrize('url', [
+    '/dashboard',
+    '/ventas',
+    '/ventas?search=alimento perro',
+    '/reporte_ventas',
+    '/reporte_stock',
+    '/reporte_bajo_stock',
+    '/reporte_analitica',
+])
+def test_pagina(benchmark, cliente, url):
+    benchmark(_get, cliente, url)
+
+
+@pytest.mark.benchmark(group='paginas')
+def test_historial_stock(benchmark, cliente, producto_mas_vendido):
+    benchmark(_get, cliente, f'/historial_stock/{producto_mas_vendido}')
+
+
+@pytest.mark.benchmark(group='paginas')
+def test_historial_stock_hasta(benchmark, cliente, producto_mas_vendido):
+    # Stock al cierre de una fecha: último corte más los movimientos posteriores
+    benchmark(_get, cliente, f'/historial_stock/{producto_mas_vendido}?hasta=2000-01-01')
+
+
+@pytest.mark.benchmark(group='paginas')
+def test_analitica_sin_cache(benchmark, app):
+    # El cálculo completo de /reporte_analitica (lectura por tramos y pandas), sin la caché
+    hoy = datetime.utcnow().date()
+    with app.app_context():
+        benchmark(lambda: analitica.calcular(analitica.cargar_productos(),
+                                             analitica.cargar_ventas(hoy - timedelta(days=89), hoy + timedelta(days=1)),
+                                             90, 7, 30))
+
+
+@pytest.mark.benchmark(group='api')
+@pytest.mark.parametrize('url', [
+    '/productos/buscar?q=alim&limite=10',
+    pytest.param('/api/v1/stock?ids=' + ','.join(str(producto_id) for producto_id in range(1, 101)),
+                 id='/api/v1/stock?ids=1..100'),
+    '/alertas/cantidad',
+])
+def test_api(benchmark, cliente, url):
+    benchmark(_get, cliente, url)
+
+
+@pytest.mark.benchmark(group='exportaciones')
+@pytest.mark.parametrize('url', ['/exportar/ventas.csv', '/exportar/stock.csv'])
+def test_exportacion(benchmark, cliente, url):
+    benchmark.pedantic(_get, args=(cliente, url), rounds=3, iterations=1)
@@ -0,0 +1,35 @@
+import pytest
+
+# Rutas de venta. Cada ronda descuenta stock, agrega la venta, el movimiento
+# del historial, el resumen diario y revisa las alertas, igual que en la caja.
+
+
+@pytest.mark.benchmark(group='ventas')
+def test_vender(benchmark, cliente, producto_para_vender):
+    def vender():
+        respuesta = cliente.post(f'/vender/{producto_para_vender}', data={'cantidad': '1'})
+        assert respuesta.status_code == 302
+
+    benchmark(vender)
+
+
+@pytest.mark.benchmark(group='ventas')
+def test_checkout(benchmark, cliente, producto_para_vender):
+    lineas = [{'producto_id': producto_para_vender, 'cantidad': 1}]
+
+    def cobrar():
+        respuesta = cliente.post('/checkout', json={'lineas': lineas})
+        assert respuesta.status_code == 201, respuesta.get_json()
+
+    benchmark(cobrar)
+
+
+@pytest.mark.benchmark(group='ventas')
+def test_api_ventas(benchmark, cliente, producto_para_vender):
+    lineas = [{'producto_id': producto_para_vender, 'cantidad': 1}]
+
+    def cobrar():
+        respuesta = cliente.post('/api/v1/ventas', json={'lineas': lineas})
+        assert respuesta.status_code == 201, respuesta.get_json()
+
+    benchmark(cobrar)
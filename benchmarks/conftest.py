@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Producto
+import datos_sinteticos
+import inventario
+
+# Benchmarks de las rutas principales sobre una base descartable con datos
+# sintéticos (perfil 'benchmark' de config.py). Desde la raíz del repositorio:
+#
+#   pip install pytest-benchmark
+#   python -m pytest benchmarks
+#
+# Los resultados quedan en benchmarks/resultados/<máquina>/NNNN_<commit>.json.
+# Para comparar con la corrida anterior y fallar si algo empeora más de un 10 %:
+#
+#   python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+#
+# La escala se ajusta con BENCH_PRODUCTOS, BENCH_VENTAS y BENCH_DIAS; la base
+# con BENCHMARK_DATABASE_URL (por defecto un SQLite en la carpeta temporal).
+
+ESCALA = {
+    'productos': int(os.environ.get('BENCH_PRODUCTOS', 1000)),
+    'ventas': int(os.environ.get('BENCH_VENTAS', 50000)),
+    'dias': int(os.environ.get('BENCH_DIAS', 365)),
+}
+
+# Stock que reciben los productos de los benchmarks de venta para no agotarse
+STOCK_BENCHMARK = 10 ** 7
+
+
+def _borrar_base(app):
+    url = db.engine.url
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(url.database + sufijo):
+                os.remove(url.database + sufijo)
+    else:
+        db.drop_all()
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('benchmark')
+    with app.app_context():
+        _borrar_base(app)
+        db.engine.dispose()
+        datos_sinteticos.generar(semilla=42, informar=lambda mensaje: None, **ESCALA)
+    return app
+
+
+@pytest.fixture(scope='session')
+def cliente(app):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert respuesta.status_code == 302
+    return cliente
+
+
+@pytest.fixture(scope='session')
+def producto_mas_vendido(app):
+    # El generador sesga las ventas hacia los primeros ids
+    with app.app_context():
+        return db.session.execute(db.select(db.func.min(Producto.id))).scalar()
+
+
+@pytest.fixture(scope='session')
+def producto_para_vender(app):
+    # Un producto con stock de sobra para que cada ronda recorra el camino de una venta exitosa
+    with app.app_context():
+        producto = db.session.execute(db.select(Producto).order_by(Producto.id.desc())).scalars().first()
+        producto.stock += STOCK_BENCHMARK
+        inventario.registrar_movimiento(producto.id, STOCK_BENCHMARK, "Reposición benchmark")
+        db.session.commit()
+        return producto.id
@@ -0,0 +1,53 @@
+import os
+import random
+
+from locust import HttpUser, between, task
+
+# Prueba de carga de la caja: muchos terminales vendiendo a la vez contra un
+# servidor real (gunicorn con wsgi.py) sobre una base con datos sintéticos:
+#
+#   DATABASE_URL=sqlite:////tmp/carga.db flask --app app generar-datos
+#   DATABASE_URL=sqlite:////tmp/carga.db gunicorn -c gunicorn.conf.py wsgi:app
+#   locust -f benchmarks/locustfile.py --host http://localhost:8000 --headless \
+#       -u 50 -r 10 -t 2m --json > benchmarks/resultados/carga_$(git rev-parse --short HEAD).json
+#
+# BENCH_PRODUCTOS debe coincidir con --productos de generar-datos. Las ventas se
+# concentran en pocos productos, como en generar-datos, para que haya
+# contención real sobre las mismas filas.
+
+PRODUCTOS = int(os.environ.get('BENCH_PRODUCTOS', 1000))
+PESOS = [1 / rango for rango in range(1, PRODUCTOS + 1)]
+
+
+def _producto():
+    return random.choices(range(1, PRODUCTOS + 1), weights=PESOS)[0]
+
+
+class Terminal(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.client.post('/api/v1/sesion', json={'username': os.environ.get('BENCH_USUARIO', 'admin'),
+                                                 'password': os.environ.get('BENCH_PASSWORD', 'admin123')})
+
+    @task(5)
+    def vender(self):
+        lineas = [{'producto_id': producto_id, 'cantidad': 1} for producto_id in {_producto() for _ in range(3)}]
+        with self.client.post('/api/v1/ventas', json={'lineas': lineas}, name='/api/v1/ventas',
+                              catch_response=True) as respuesta:
+            # Sin stock (409) es una respuesta correcta bajo carga, no un error del servidor
+            if respuesta.status_code in (201, 409):
+                respuesta.success()
+
+    @task(3)
+    def consultar_stock(self):
+        ids = ','.join(str(_producto()) for _ in range(10))
+        self.client.get(f'/api/v1/stock?ids={ids}', name='/api/v1/stock')
+
+    @task(2)
+    def buscar(self):
+        self.client.get('/api/v1/productos?q=alim', name='/api/v1/productos')
+
+    @task(1)
+    def dashboard(self):
+        self.client.get('/dashboard')
@@ -0,0 +1,114 @@
+import functools
+import hashlib
+import os
+
+from flask import abort, current_app, render_template, send_file
+
+from models import Venta
+import archivo
+import trabajos
+import metricas
+
+PLANTILLA = 'boleta.html'
+
+
+@functools.lru_cache(maxsize=8)
+def _ruta_plantilla(entorno):
+    _, ruta, _ = entorno.loader.get_source(entorno, PLANTILLA)
+    return ruta
+
+
+@functools.lru_cache(maxsize=8)
+def _hash_archivo(ruta, modificado):
+    with open(ruta, 'rb') as archivo:
+        return hashlib.sha256(archivo.read()).hexdigest()
+
+
+def _hash_plantilla():
+    # La plantilla se lee y se hashea una vez por proceso y por versión del archivo:
+    # en cada boleta solo se consulta su fecha de modificación
+    ruta = _ruta_plantilla(current_app.jinja_env)
+    return _hash_archivo(ruta, os.stat(ruta).st_mtime_ns)
+
+
+def clave(venta, producto):
+    # La clave incluye todo lo que imprime la boleta y la plantilla: si la venta
+    # se borra y su id se reutiliza, o cambia la plantilla, la clave es otra y
+    # nunca se sirve un PDF de otra venta
+    contenido = (f"{venta.id}:{venta.fecha}:{venta.producto_id}:{producto.nombre}:{venta.cantidad}:"
+                 f"{venta.precio_unitario}:{venta.total}:{_hash_plantilla()}")
+    return hashlib.sha256(contenido.encode("UTF-8")).hexdigest()
+
+
+def _ruta(carpeta, venta_id, clave_boleta):
+    return os.path.join(carpeta, f"boleta_{venta_id}_{clave_boleta[:16]}.pdf")
+
+
+def borrar(carpeta, venta_ids):
+    """Borra las boletas en caché de las ventas `venta_ids` (al eliminar sus ventas)."""
+    prefijos = tuple(f"boleta_{venta_id}_" for venta_id in venta_ids)
+    if not prefijos or not os.path.isdir(carpeta):
+        return
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith(prefijos):
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except OSError:
+                pass  # Otro proceso pudo haberla borrado primero
+
+
+def desalojar(carpeta, max_bytes, conservar=None):
+    """Borra las boletas menos usadas hasta que la carpeta quede bajo `max_bytes`."""
+    archivos = []
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith('boleta_') and nombre.endswith('.pdf'):
+            ruta = os.path.join(carpeta, nombre)
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= max_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass  # Otro proceso pudo haberla borrado primero
+        total -= tamano
+
+
+def enviar_boleta(venta_id):
+    """Responde con el PDF de la boleta, generándolo solo si no está en caché.
+
+    La venta se lee siempre (una búsqueda por clave primaria) para armar la
+    clave; las respuestas llevan ETag, así que un navegador que ya tiene la
+    boleta recibe un 304 sin que se genere el PDF.
+    """
+    venta = archivo.obtener(Venta, venta_id)
+    if venta is None:
+        abort(404)
+    carpeta = current_app.config['BOLETAS_FOLDER']
+    clave_boleta = clave(venta, venta.producto)
+    ruta = _ruta(carpeta, venta_id, clave_boleta)
+
+    try:
+        os.utime(ruta)  # Marca el uso para la política LRU
+        en_cache = True
+    except FileNotFoundError:
+        en_cache = False
+
+    if not en_cache:
+        rendered = render_template(PLANTILLA, venta=venta, producto=venta.producto)
+        os.makedirs(carpeta, exist_ok=True)
+        # generar_pdf escribe en un temporal y lo renombra: nunca se sirve un PDF a medias
+        with metricas.medir('segundos_pdf'):
+            trabajos.renderizar(rendered, ruta, current_app.config['PDF_WORKERS'])
+        desalojar(carpeta, current_app.config['BOLETAS_CACHE_MAX_BYTES'], conservar=ruta)
+
+    return send_file(ruta, as_attachment=True, download_name=f'boleta_{venta_id}.pdf',
+                     etag=clave_boleta[:32], conditional=True)
@@ -0,0 +1,90 @@
+import re
+
+from sqlalchemy import column, event, false, select, table
+
+from models import db, Producto
+
+# Búsqueda de productos por nombre con el índice de texto completo FTS5 de SQLite.
+# La tabla virtual producto_fts indexa producto.nombre (sin duplicar los datos)
+# y se mantiene sincronizada con triggers. El tokenizador ignora mayúsculas y
+# acentos, y los índices de prefijo permiten buscar mientras se escribe.
+# Ojo: una migración que recree la tabla producto con batch_alter_table borra
+# los triggers; hay que volver a crearlos con INSTRUCCIONES_FTS.
+
+INSTRUCCIONES_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5(
+        nombre, content='producto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_ai AFTER INSERT ON producto BEGIN
+        INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_ad AFTER DELETE ON producto BEGIN
+        INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_au AFTER UPDATE OF nombre ON producto BEGIN
+        INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+        INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END""",
+]
+
+producto_fts = table('producto_fts', column('rowid'), column('rank'), column('producto_fts'))
+
+MAX_RESULTADOS = 50
+
+
+def _crear_indice_fts(tabla, conexion, **kw):
+    # Para bases creadas con db.create_all() (init_db.py) en lugar de migraciones
+    if conexion.dialect.name == 'sqlite':
+        for instruccion in INSTRUCCIONES_FTS:
+            conexion.exec_driver_sql(instruccion)
+
+
+event.listen(Producto.__table__, 'after_create', _crear_indice_fts)
+
+
+def _usa_fts():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def expresion_fts(termino):
+    """Convierte lo escrito por el usuario en una consulta FTS5 segura.
+
+    Cada palabra se cita (para que caracteres como comillas o guiones no sean
+    sintaxis FTS) y se busca como prefijo: "alim per" encuentra "Alimento perro".
+    """
+    palabras = re.findall(r'\w+', termino or '')
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def filtro_nombre(termino):
+    """Condición sobre Producto para filtrar por nombre usando el índice de texto."""
+    if not _usa_fts():
+        return Producto.nombre.ilike(f'%{termino}%')
+    expresion = expresion_fts(termino)
+    if not expresion:
+        return false()
+    coincidencias = select(producto_fts.c.rowid).where(producto_fts.c.producto_fts.op('MATCH')(expresion))
+    return Producto.id.in_(coincidencias)
+
+
+def buscar_productos(termino, limite=10, solo_con_stock=False):
+    """Devuelve productos cuyo nombre coincide, ordenados por relevancia (bm25)."""
+    limite = max(1, min(int(limite), MAX_RESULTADOS))
+    consulta = select(Producto.id, Producto.nombre, Producto.precio, Producto.stock)
+
+    if _usa_fts():
+        expresion = expresion_fts(termino)
+        if not expresion:
+            return []
+        consulta = (
+            consulta.join(producto_fts, producto_fts.c.rowid == Producto.id)
+            .where(producto_fts.c.producto_fts.op('MATCH')(expresion))
+            .order_by(producto_fts.c.rank)
+        )
+    else:
+        consulta = consulta.where(Producto.nombre.ilike(f'%{termino}%')).order_by(Producto.nombre)
+
+    if solo_con_stock:
+        consulta = consulta.where(Producto.stock > 0)
+    return db.session.execute(consulta.limit(limite)).all()
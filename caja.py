@@ -0,0 +1,133 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from models import db, Producto, Venta
+import catalogo
+import inventario
+import resumen_diario
+
+# Máximo de líneas aceptadas en un mismo cobro
+MAX_LINEAS = 200
+
+
+class StockInsuficiente(ValueError):
+    def __init__(self, productos):
+        self.productos = productos  # Lista de (producto_id, nombre, stock disponible)
+        nombres = ', '.join(nombre for _, nombre, _ in productos)
+        super().__init__(f"No hay suficiente stock de: {nombres}.")
+
+    def como_json(self):
+        return [{'producto_id': producto_id, 'nombre': nombre, 'stock': stock}
+                for producto_id, nombre, stock in self.productos]
+
+
+def normalizar_lineas(lineas):
+    """Valida las líneas del carrito y agrupa las cantidades por producto."""
+    if not isinstance(lineas, list) or not lineas:
+        raise ValueError("El carrito no tiene líneas.")
+    if len(lineas) > MAX_LINEAS:
+        raise ValueError(f"El carrito no puede tener más de {MAX_LINEAS} líneas.")
+
+    cantidades = defaultdict(int)
+    for linea in lineas:
+        try:
+            producto_id = int(linea['producto_id'])
+            cantidad = int(linea['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Cada línea debe tener producto_id y cantidad numéricos.")
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a 0.")
+        cantidades[producto_id] += cantidad
+    return dict(cantidades)
+
+
+def cobrar(lineas):
+    """Registra todas las líneas de un carrito en la transacción en curso.
+
+    Lee los productos en una consulta, descuenta el stock de todos con un solo
+    UPDATE e inserta las ventas y el resumen diario en lote. Si algún producto
+    no tiene stock deshace la transacción y lanza StockInsuficiente; en caso
+    contrario quien llama hace el commit. Devuelve la boleta como diccionario.
+    """
+    cantidades = normalizar_lineas(lineas)
+
+    productos = {
+        fila.id: fila
+        for fila in db.session.execute(
+            select(Producto.id, Producto.nombre, Producto.precio, Producto.categoria_id)
+            .where(Producto.id.in_(cantidades))
+        )
+    }
+    faltantes = sorted(set(cantidades) - set(productos))
+    if faltantes:
+        raise ValueError(f"Productos inexistentes: {', '.join(map(str, faltantes))}.")
+
+    sin_stock = inventario.descontar_stock_lote(cantidades, "Venta")
+    if sin_stock:
+        # El UPDATE no tocó esas filas: su stock se lee antes del rollback, en la misma transacción
+        stock = dict(db.session.execute(
+            select(Producto.id, Producto.stock).where(Producto.id.in_(sin_stock))
+        ).all())
+        db.session.rollback()
+        raise StockInsuficiente([
+            (producto_id, productos[producto_id].nombre, stock[producto_id]) for producto_id in sin_stock
+        ])
+
+    # Todas las líneas del carrito comparten la misma fecha (UTC, como las demás fechas)
+    fecha = datetime.utcnow().replace(microsecond=0)
+    filas = [
+        {
+            'producto_id': producto_id,
+            'cantidad': cantidad,
+            'precio_unitario': productos[producto_id].precio,
+            'total': cantidad * productos[producto_id].precio,
+            'fecha': fecha,
+        }
+        for producto_id, cantidad in cantidades.items()
+    ]
+    ids = db.session.scalars(
+        insert(Venta).returning(Venta.id, sort_by_parameter_order=True), filas
+    ).all()
+    resumen_diario.registrar_ventas(fecha, [
+        {
+            'producto_id': fila['producto_id'],
+            'categoria_id': productos[fila['producto_id']].categoria_id,
+            'unidades': fila['cantidad'],
+            'total': fila['total'],
+        }
+        for fila in filas
+    ])
+
+    return {
+        'fecha': fecha.isoformat(),
+        'lineas': [
+            {
+                'venta_id': venta_id,
+                'producto_id': fila['producto_id'],
+                'nombre': productos[fila['producto_id']].nombre,
+                'cantidad': fila['cantidad'],
+                'precio_unitario': fila['precio_unitario'],
+                'total': fila['total'],
+            }
+            for venta_id, fila in zip(ids, filas)
+        ],
+        'total': sum(fila['total'] for fila in filas),
+    }
+
+
+def cobrar_y_confirmar(lineas):
+    """Cobra el carrito y hace commit; en cualquier error deshace la transacción.
+
+    Lanza StockInsuficiente (un ValueError) si falta stock y ValueError si el
+    carrito no es válido. Devuelve la boleta como diccionario.
+    """
+    try:
+        boleta = cobrar(lineas)
+        db.session.commit()
+    except ValueError:
+        db.session.rollback()
+        raise
+    catalogo.invalidar()
+    return boleta
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from models import db, Producto, Categoria
+
+# Caché de lectura del catálogo (productos y categorías). Se guardan listas de
+# diccionarios, no objetos del ORM, para poder compartirlas entre peticiones y
+# procesos. Las entradas vencen por TTL y además se invalidan explícitamente
+# desde cada ruta que modifica productos, stock o categorías.
+#
+# Con CACHE_URL (p. ej. redis://localhost:6379/0) la caché se guarda
+# en Redis y todos los workers de gunicorn ven la misma invalidación; sin ella
+# cada proceso usa su propia caché LRU en memoria.
+
+PREFIJO = 'veterinaria:catalogo:'
+
+
+class CacheLocal:
+    """Caché LRU en memoria del proceso, con vencimiento por entrada."""
+
+    def __init__(self, max_entradas=128):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave):
+        with self._bloqueo:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl):
+        with self._bloqueo:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def borrar(self, *claves):
+        with self._bloqueo:
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+
+class CacheRedis:
+    """Caché compartida entre procesos; requiere el paquete redis."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL requiere instalar el paquete 'redis'.") from e
+        self._cliente = redis.Redis.from_url(url)
+
+    def obtener(self, clave):
+        valor = self._cliente.get(clave)
+        return json.loads(valor) if valor is not None else None
+
+    def guardar(self, clave, valor, ttl):
+        self._cliente.setex(clave, ttl, json.dumps(valor))
+
+    def borrar(self, *claves):
+        self._cliente.delete(*claves)
+
+
+_config = {'backend': CacheLocal(), 'ttl': 60}
+
+
+def init_app(app):
+    _config['ttl'] = app.config.get('CATALOGO_CACHE_TTL', 60)
+    url = app.config.get('CACHE_URL')
+    _config['backend'] = CacheRedis(url) if url else CacheLocal()
+
+
+def _leer(clave, cargar):
+    backend = _config['backend']
+    valor = backend.obtener(PREFIJO + clave)
+    if valor is None:
+        valor = cargar()
+        backend.guardar(PREFIJO + clave, valor, _config['ttl'])
+    return valor
+
+
+def _cargar_productos():
+    consulta = (
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.stock,
+               (Producto.stock * Producto.precio).label('valor'),
+               Producto.categoria_id, Categoria.nombre.label('categoria_nombre'))
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .order_by(Producto.id)
+    )
+    return [dict(fila._mapping) for fila in db.session.execute(consulta)]
+
+
+def _cargar_categorias():
+    consulta = select(Categoria.id, Categoria.nombre).order_by(Categoria.nombre)
+    return [dict(fila._mapping) for fila in db.session.execute(consulta)]
+
+
+def productos():
+    """Lista de productos como diccionarios (id, nombre, precio, stock, valor, categoria_id, categoria_nombre)."""
+    return _leer('productos', _cargar_productos)
+
+
+def productos_con_stock():
+    return [producto for producto in productos() if producto['stock'] > 0]
+
+
+def categorias():
+    """Lista de categorías como diccionarios (id, nombre), ordenadas por nombre."""
+    return _leer('categorias', _cargar_categorias)
+
+
+def invalidar():
+    """Descarta el catálogo en caché; llamar después de confirmar cualquier cambio."""
+    _config['backend'].borrar(PREFIJO + 'productos', PREFIJO + 'categorias')
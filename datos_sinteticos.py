@@ -0,0 +1,124 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from models import db, Usuario, Producto, Categoria, Venta, HistorialStock
+import alertas
+import inventario
+import resumen_diario
+
+# Genera datos sintéticos reproducibles (misma semilla = mismos datos) para
+# benchmarks y pruebas de carga. Escribe en la base configurada, que debe estar
+# vacía: usar siempre una base descartable (perfil 'benchmark' o DATABASE_URL).
+# Los datos respetan las invariantes de la aplicación: el historial de stock
+# suma el stock de cada producto, el resumen diario cuadra con las ventas y las
+# alertas de stock bajo están al día.
+
+FILAS_POR_LOTE = 5000
+
+TIPOS = ['Alimento', 'Snack', 'Arena', 'Collar', 'Correa', 'Juguete', 'Shampoo', 'Antiparasitario',
+         'Vitaminas', 'Cama', 'Comedero', 'Transportadora', 'Rascador', 'Jaula', 'Pipeta']
+ESPECIES = ['perro', 'gato', 'cachorro', 'gatito', 'ave', 'conejo', 'hámster', 'pez']
+VARIANTES = ['adulto', 'senior', 'light', 'premium', 'original', 'grande', 'mediano', 'pequeño',
+             'pollo', 'carne', 'salmón', 'cordero']
+
+
+def _lotes(filas):
+    for inicio in range(0, len(filas), FILAS_POR_LOTE):
+        yield filas[inicio:inicio + FILAS_POR_LOTE]
+
+
+def _insertar(modelo, filas):
+    for lote in _lotes(filas):
+        db.session.execute(insert(modelo), lote)
+
+
+def generar(productos=1000, categorias=20, ventas=50000, dias=365, semilla=42,
+            usuario='admin', password='admin123', informar=print):
+    """Llena la base configurada con datos sintéticos y hace commit.
+
+    Las ventas se reparten en los últimos `dias` días con una distribución
+    sesgada (pocos productos concentran la mayoría), como en una tienda real.
+    Devuelve la cantidad de filas creadas por tabla.
+    """
+    if productos < 1 or categorias < 1 or ventas < 0 or dias < 1:
+        raise ValueError("Se necesita al menos un producto, una categoría y un día.")
+    db.create_all()
+    if db.session.execute(select(func.count()).select_from(Producto)).scalar():
+        raise ValueError("La base ya tiene productos; los datos sintéticos van en una base vacía.")
+
+    azar = random.Random(semilla)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    inicio = ahora - timedelta(days=dias)
+
+    if not Usuario.query.filter_by(username=usuario).first():
+        nuevo_usuario = Usuario(username=usuario)
+        nuevo_usuario.set_password(password)
+        db.session.add(nuevo_usuario)
+
+    _insertar(Categoria, [{'nombre': f'Categoría {numero}'} for numero in range(1, categorias + 1)])
+    categoria_ids = db.session.scalars(select(Categoria.id).order_by(Categoria.id)).all()
+
+    _insertar(Producto, [
+        {
+            'nombre': f'{azar.choice(TIPOS)} {azar.choice(ESPECIES)} {azar.choice(VARIANTES)} {numero}',
+            'precio': float(azar.randrange(500, 50000, 10)),
+            'stock': azar.randint(0, 200),
+            'categoria_id': azar.choice(categoria_ids),
+        }
+        for numero in range(1, productos + 1)
+    ])
+    filas_productos = db.session.execute(select(Producto.id, Producto.precio, Producto.stock).order_by(Producto.id)).all()
+    informar(f"{len(categoria_ids)} categorías y {len(filas_productos)} productos.")
+
+    # Peso 1/rango: el primer producto se vende mucho más que el último
+    pesos = [1 / rango for rango in range(1, len(filas_productos) + 1)]
+    segundos = int((ahora - inicio).total_seconds())
+    filas_ventas = []
+    for producto in azar.choices(filas_productos, weights=pesos, k=ventas):
+        cantidad = azar.randint(1, 5)
+        filas_ventas.append({
+            'producto_id': producto.id,
+            'cantidad': cantidad,
+            'precio_unitario': producto.precio,
+            'total': cantidad * producto.precio,
+            'fecha': inicio + timedelta(seconds=azar.randrange(segundos)),
+        })
+    filas_ventas.sort(key=lambda fila: fila['fecha'])
+    _insertar(Venta, filas_ventas)
+    informar(f"{len(filas_ventas)} ventas.")
+
+    # Historial: un stock inicial que cubre todo lo vendido y una salida por venta
+    vendido = {}
+    for fila in filas_ventas:
+        vendido[fila['producto_id']] = vendido.get(fila['producto_id'], 0) + fila['cantidad']
+    filas_historial = [
+        {'producto_id': producto.id, 'cantidad_cambiada': producto.stock + vendido.get(producto.id, 0),
+         'motivo': 'Stock inicial', 'fecha': inicio}
+        for producto in filas_productos
+        if producto.stock + vendido.get(producto.id, 0)
+    ]
+    filas_historial += [
+        {'producto_id': fila['producto_id'], 'cantidad_cambiada': -fila['cantidad'], 'motivo': 'Venta',
+         'fecha': fila['fecha']}
+        for fila in filas_ventas
+    ]
+    _insertar(HistorialStock, filas_historial)
+    informar(f"{len(filas_historial)} movimientos de stock.")
+
+    resumen_diario.reconstruir()
+    cortes = inventario.crear_cortes()
+    producto_ids = [producto.id for producto in filas_productos]
+    for lote in _lotes(producto_ids):
+        alertas.revisar(lote)
+    db.session.commit()
+    informar(f"{cortes} cortes de stock y {alertas.contar()} alertas de stock bajo.")
+
+    return {
+        'categoria': len(categoria_ids),
+        'producto': len(filas_productos),
+        'venta': len(filas_ventas),
+        'historial_stock': len(filas_historial),
+        'corte_stock': cortes,
+    }
@@ -0,0 +1,98 @@
+import csv
+import io
+import tempfile
+
+from openpyxl import Workbook
+from sqlalchemy import func, select
+
+from models import db, Venta, Producto, Categoria, ProductoEliminado
+import archivo
+
+# Filas que se traen de la base de datos en cada tanda del cursor
+FILAS_POR_TANDA = 1000
+
+
+def _consulta_ventas():
+    # Incluye las ventas archivadas
+    ventas = archivo.fuente(Venta)
+    return (
+        select(ventas.id, ventas.fecha, Producto.nombre, ventas.cantidad, ventas.precio_unitario, ventas.total)
+        .join(Producto, ventas.producto_id == Producto.id)
+        .order_by(ventas.fecha, ventas.id)
+    )
+
+
+def _consulta_stock():
+    return (
+        select(
+            Producto.id,
+            Producto.nombre,
+            func.coalesce(Categoria.nombre, 'Sin Categoría'),
+            Producto.stock,
+            Producto.precio,
+            Producto.stock * Producto.precio,
+        )
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .order_by(Producto.id)
+    )
+
+
+def _consulta_productos_eliminados():
+    return (
+        select(
+            ProductoEliminado.id,
+            ProductoEliminado.nombre,
+            ProductoEliminado.precio,
+            ProductoEliminado.stock,
+            ProductoEliminado.fecha_eliminacion,
+        )
+        .order_by(ProductoEliminado.id)
+    )
+
+
+# reporte -> (encabezados, función que arma la consulta)
+REPORTES = {
+    'ventas': (['ID', 'Fecha', 'Producto', 'Cantidad', 'Precio Unitario', 'Total'], _consulta_ventas),
+    'stock': (['ID', 'Producto', 'Categoría', 'Stock', 'Precio Unitario', 'Valor Total'], _consulta_stock),
+    'productos_eliminados': (['ID', 'Nombre', 'Precio', 'Stock', 'Fecha de Eliminación'],
+                             _consulta_productos_eliminados),
+}
+
+
+def _tandas(reporte):
+    # Cursor del lado del servidor: nunca hay más de FILAS_POR_TANDA filas en memoria
+    _, consulta = REPORTES[reporte]
+    resultado = db.session.execute(consulta().execution_options(yield_per=FILAS_POR_TANDA))
+    yield from resultado.partitions()
+
+
+def generar_csv(reporte):
+    """Genera el CSV por trozos, listo para una respuesta en streaming."""
+    encabezados, _ = REPORTES[reporte]
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    buffer.write('\ufeff')  # BOM para que Excel reconozca UTF-8
+    escritor.writerow(encabezados)
+    for tanda in _tandas(reporte):
+        escritor.writerows(tanda)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def generar_xlsx(reporte):
+    """Escribe el reporte en un .xlsx en modo solo escritura y devuelve el archivo abierto."""
+    encabezados, _ = REPORTES[reporte]
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(reporte)
+    hoja.append(encabezados)
+    for tanda in _tandas(reporte):
+        for fila in tanda:
+            hoja.append(list(fila))
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+# Configuración de gunicorn para wsgi:app. Cada worker es un proceso con su
+# propio pool de conexiones (SQLALCHEMY_ENGINE_OPTIONS); los hilos de un worker
+# comparten ese pool, así que threads no debe superar pool_size + max_overflow.
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Con muchos terminales conectados y ociosos (API /api/v1) conviene
+# GUNICORN_WORKER_CLASS=gevent: cada conexión es una greenlet y no un hilo.
+# Requiere el paquete gevent (y psycogreen si se usa PostgreSQL con psycopg2);
+# el pool de conexiones sigue acotando cuántas consultas corren a la vez.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Los PDF se generan fuera de la petición, pero la importación de planillas puede tardar
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers de vez en cuando acota el crecimiento de memoria (pandas, xhtml2pdf)
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
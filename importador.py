@@ -0,0 +1,201 @@
+import csv
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import bindparam, select
+
+from models import db, Producto, Categoria
+import inventario
+
+# Filas procesadas por lote: acota la memoria sin importar el tamaño del archivo
+TAMANO_LOTE = 1000
+COLUMNAS_REQUERIDAS = {'nombre', 'precio', 'stock'}
+MOTIVO = "Carga de productos"  # Motivo de los movimientos en el historial de stock
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.errores = []  # Lista de (número de fila en el archivo, mensaje)
+
+
+def _filas_xlsx(ruta):
+    # Modo solo lectura: openpyxl entrega las filas sin cargar la hoja completa
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def _filas_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        yield from csv.reader(archivo)
+
+
+def leer_filas(ruta):
+    """Devuelve (encabezados, iterador de filas) para un archivo .xlsx o .csv."""
+    filas = _filas_csv(ruta) if ruta.lower().endswith('.csv') else _filas_xlsx(ruta)
+    encabezados = next(filas, None) or ()
+    encabezados = [str(columna).strip().lower() if columna is not None else '' for columna in encabezados]
+    return encabezados, filas
+
+
+def _valor(fila, indice):
+    valor = fila[indice] if indice < len(fila) else None
+    return None if valor == '' else valor
+
+
+class _CacheCategorias:
+    # Las categorías son pocas: se leen una vez y se resuelven por nombre en memoria
+    def __init__(self):
+        self.por_nombre = {
+            nombre.strip().lower(): id
+            for id, nombre in db.session.execute(select(Categoria.id, Categoria.nombre))
+        }
+        self.ids = set(self.por_nombre.values())
+
+    def resolver(self, valor):
+        if valor is None or (isinstance(valor, float) and pd.isna(valor)) or str(valor).strip() == '':
+            return None, None
+        if isinstance(valor, (int, float)) or str(valor).strip().isdigit():
+            categoria_id = int(float(valor))
+            if categoria_id in self.ids:
+                return categoria_id, None
+            return None, f"La categoría {categoria_id} no existe."
+        categoria_id = self.por_nombre.get(str(valor).strip().lower())
+        if categoria_id is None:
+            return None, f"La categoría '{valor}' no existe."
+        return categoria_id, None
+
+
+def _validar_lote(df, resultado, categorias):
+    # Validación vectorizada de todo el lote; las filas inválidas se reportan y se descartan
+    df['nombre'] = df['nombre'].astype('string').str.strip()
+    df['precio'] = pd.to_numeric(df['precio'], errors='coerce')
+    df['stock'] = pd.to_numeric(df['stock'], errors='coerce')
+
+    reglas = [
+        (df['nombre'].isna() | (df['nombre'] == ''), "El nombre del producto no puede estar vacío."),
+        (df['precio'].isna(), "El precio debe ser numérico."),
+        (df['precio'] < 0, "El precio no puede ser negativo."),
+        (df['stock'].isna() | (df['stock'] % 1 != 0), "El stock debe ser un número entero."),
+        (df['stock'] < 0, "El stock no puede ser negativo."),
+        (df['nombre'].str.len() > 100, "El nombre no puede superar los 100 caracteres."),
+    ]
+    invalidas = pd.Series(False, index=df.index)
+    for mascara, mensaje in reglas:
+        mascara = mascara.fillna(False) & ~invalidas
+        resultado.errores.extend((int(fila), mensaje) for fila in df.loc[mascara, 'fila'])
+        invalidas |= mascara
+
+    df = df[~invalidas].copy()
+    if 'categoria' in df.columns:
+        # Se resuelve cada valor distinto una sola vez y luego se mapea todo el lote
+        unicos = df['categoria'].drop_duplicates()
+        resueltas = df['categoria'].map(dict(zip(unicos, unicos.map(categorias.resolver))))
+        df['categoria_id'] = resueltas.map(lambda par: par[0])
+        errores = resueltas.map(lambda par: par[1])
+        con_error = errores.notna()
+        resultado.errores.extend(zip(df.loc[con_error, 'fila'].astype(int), errores[con_error]))
+        df = df[~con_error]
+
+    df['precio'] = df['precio'].round()
+    df['stock'] = df['stock'].astype(int)
+    # Si un nombre se repite dentro del lote, prevalece la última fila
+    return df.drop_duplicates('nombre', keep='last')
+
+
+def _guardar_lote(df, resultado):
+    tabla = Producto.__table__
+    # Antes de leer el stock se toman las filas con un UPDATE que no cambia nada
+    # (stock = stock): en PostgreSQL las bloquea y en SQLite toma el bloqueo de
+    # escritura, ambos hasta el commit. Así ninguna venta se confirma entre la
+    # lectura y el UPDATE y el historial sigue sumando el stock.
+    db.session.execute(tabla.update().where(tabla.c.nombre.in_(df['nombre'].tolist())).values(stock=tabla.c.stock))
+
+    # Productos existentes con esos nombres (si hay duplicados históricos, el de menor id)
+    existentes = {}
+    for fila in db.session.execute(
+        select(Producto.nombre, Producto.id, Producto.stock)
+        .where(Producto.nombre.in_(df['nombre'].tolist()))
+        .order_by(Producto.id)
+    ):
+        existentes.setdefault(fila.nombre, fila)
+
+    columnas = ['nombre', 'precio', 'stock'] + (['categoria_id'] if 'categoria_id' in df.columns else [])
+    registros = df[columnas].astype(object).where(df[columnas].notna(), None).to_dict('records')
+
+    nuevos = [registro for registro in registros if registro['nombre'] not in existentes]
+    cambios = [dict(registro, _id=existentes[registro['nombre']].id) for registro in registros
+               if registro['nombre'] in existentes]
+
+    # Un executemany por tipo de operación en lugar de un INSERT/UPDATE por fila
+    movimientos = []
+    if nuevos:
+        ids = db.session.scalars(
+            tabla.insert().returning(tabla.c.id, sort_by_parameter_order=True), nuevos
+        ).all()
+        movimientos += [(producto_id, registro['stock'], MOTIVO) for producto_id, registro in zip(ids, nuevos)]
+    if cambios:
+        # Una celda de categoría vacía deja la categoría actual: esas filas se actualizan sin la columna
+        # (un executemany necesita las mismas columnas en todas las filas)
+        sin_categoria = [{clave: valor for clave, valor in registro.items() if clave != 'categoria_id'}
+                         for registro in cambios if registro.get('categoria_id') is None]
+        con_categoria = [registro for registro in cambios if registro.get('categoria_id') is not None]
+        for grupo in (con_categoria, sin_categoria):
+            if grupo:
+                db.session.execute(tabla.update().where(tabla.c.id == bindparam('_id')), grupo)
+        # El historial guarda la diferencia con el stock anterior
+        movimientos += [
+            (registro['_id'], registro['stock'] - existentes[registro['nombre']].stock, MOTIVO)
+            for registro in cambios
+        ]
+    inventario.registrar_movimientos(movimientos)
+    resultado.insertados += len(nuevos)
+    resultado.actualizados += len(cambios)
+
+
+def importar_productos(ruta, tamano_lote=TAMANO_LOTE):
+    """Importa o actualiza productos desde un .xlsx o .csv leyendo por lotes.
+
+    Los productos se identifican por nombre: si ya existe se actualizan su
+    precio, stock y categoría; si no, se crea. La columna opcional `categoria`
+    acepta el nombre o el id de una categoría existente; vacía, no cambia la
+    categoría de un producto existente. Lanza ValueError si
+    faltan columnas; los errores por fila se devuelven en el resultado.
+    """
+    encabezados, filas = leer_filas(ruta)
+    faltantes = COLUMNAS_REQUERIDAS - set(encabezados)
+    if faltantes:
+        raise ValueError(f"El archivo debe contener las columnas: {', '.join(sorted(COLUMNAS_REQUERIDAS))}.")
+    if 'categoria_id' in encabezados and 'categoria' not in encabezados:
+        encabezados[encabezados.index('categoria_id')] = 'categoria'
+
+    indices = {columna: encabezados.index(columna) for columna in COLUMNAS_REQUERIDAS | {'categoria'}
+               if columna in encabezados}
+    resultado = ResultadoImportacion()
+    categorias = _CacheCategorias()
+    numero_fila = 1  # La fila 1 es el encabezado
+
+    while True:
+        lote = list(islice(filas, tamano_lote))
+        if not lote:
+            break
+        df = pd.DataFrame(
+            {columna: [_valor(fila, indice) for fila in lote] for columna, indice in indices.items()}
+        )
+        df['fila'] = range(numero_fila + 1, numero_fila + 1 + len(lote))
+        numero_fila += len(lote)
+
+        # Las filas completamente vacías (frecuentes al final de un Excel) se ignoran
+        df = df[df[list(indices)].notna().any(axis=1)]
+        df = _validar_lote(df, resultado, categorias)
+        if not df.empty:
+            _guardar_lote(df, resultado)
+
+    db.session.commit()
+    resultado.errores.sort()
+    return resultado
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from models import db, Venta, Producto
+import agregaciones
+import inventario
+import alertas
+from paginacion import consulta_ventas
+
+# Consultas de las rutas más usadas: (nombre, tabla que no debe recorrerse completa, consulta)
+CONSULTAS_CRITICAS = [
+    ('ventas paginadas', 'venta', lambda: consulta_ventas().limit(51)),
+    ('ventas paginadas con cursor', 'venta',
+     lambda: consulta_ventas(posicion=(datetime(2025, 1, 1), 1)).limit(51)),
+    ('ventas del día', 'venta', lambda: select(agregaciones.consulta_hechos(datetime.utcnow().date()))),
+    ('ventas de un producto', 'venta', lambda: Venta.query.filter_by(producto_id=1)),
+    ('historial de stock', 'historial_stock', lambda: inventario.consulta_historial(1)),
+    ('productos con alerta de stock', 'producto', lambda: alertas.consulta_alertas()),
+    ('productos de una categoría', 'producto', lambda: Producto.query.filter_by(categoria_id=1)),
+]
+
+
+def plan(consulta):
+    """Devuelve las líneas de EXPLAIN QUERY PLAN de una consulta (solo SQLite)."""
+    if hasattr(consulta, 'statement'):
+        consulta = consulta.statement
+    sql = consulta.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    return [fila[-1] for fila in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+def verificar_planes():
+    """Devuelve [(nombre, plan)] de las consultas críticas que recorren su tabla completa.
+
+    SQLite informa un recorrido completo como "SCAN <tabla>", tanto sobre la
+    tabla como sobre un índice completo; las búsquedas acotadas son "SEARCH".
+    """
+    fallas = []
+    for nombre, tabla, construir in CONSULTAS_CRITICAS:
+        detalle = plan(construir())
+        if any(linea == f'SCAN {tabla}' or linea.startswith(f'SCAN {tabla} ') for linea in detalle):
+            fallas.append((nombre, detalle))
+    return fallas
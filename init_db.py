@@ -1,4 +1,7 @@
-from app import app, db
+from app import create_app
+from models import db
+
+app = create_app()
 
 # Crear las tablas en la base de datos
 with app.app_context():
@@ -0,0 +1,231 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, exists, func, insert, literal, or_, select, update
+
+from models import db, Producto, HistorialStock, CorteStock
+import alertas
+import archivo
+
+# Todo movimiento de stock pasa por este módulo: Producto.stock guarda el valor
+# actual (para descontar con un UPDATE condicional) y cada cambio agrega una
+# fila a historial_stock en la misma transacción, de modo que el historial
+# siempre suma el stock. Los cortes (corte_stock) permiten saber el stock en
+# cualquier momento sin sumar el historial completo. Cada movimiento revisa
+# además las alertas de stock bajo de los productos afectados. Los movimientos
+# anteriores al horizonte de archivo.py se leen también de su archivo.
+
+
+def registrar_movimiento(producto_id, cantidad, motivo):
+    """Agrega un movimiento al historial; quien llama hace el commit."""
+    registrar_movimientos([(producto_id, cantidad, motivo)])
+
+
+def registrar_movimientos(movimientos):
+    """Agrega varios movimientos [(producto_id, cantidad, motivo)] con un solo INSERT."""
+    filas = [
+        {'producto_id': producto_id, 'cantidad_cambiada': cantidad, 'motivo': motivo}
+        for producto_id, cantidad, motivo in movimientos
+        if cantidad
+    ]
+    if filas:
+        db.session.execute(insert(HistorialStock), filas)
+    alertas.revisar([producto_id for producto_id, _, _ in movimientos])
+
+
+def descontar_stock(producto_id, cantidad, motivo):
+    """Descuenta stock con un único UPDATE condicional y registra el movimiento.
+
+    La comparación y la resta ocurren en la base de datos, por lo que dos cajas
+    vendiendo el mismo producto a la vez no pueden dejar el stock negativo ni
+    perder una actualización. Devuelve False si no había stock suficiente. El
+    cambio queda en la transacción en curso; quien llama hace el commit.
+    """
+    if cantidad <= 0:
+        raise ValueError("La cantidad debe ser mayor a 0.")
+
+    resultado = db.session.execute(
+        update(Producto)
+        .where(Producto.id == producto_id, Producto.stock >= cantidad)
+        .values(stock=Producto.stock - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        return False
+    registrar_movimiento(producto_id, -cantidad, motivo)
+    return True
+
+
+def descontar_stock_lote(cantidades, motivo):
+    """Descuenta stock de varios productos con un solo UPDATE.
+
+    `cantidades` es un diccionario {producto_id: cantidad}. Devuelve los ids
+    de los productos que no tenían stock suficiente (vacío si se descontó
+    todo). Si no está vacío, quien llama debe hacer rollback porque las filas
+    que sí cumplían ya quedaron descontadas en la transacción.
+    """
+    if any(cantidad <= 0 for cantidad in cantidades.values()):
+        raise ValueError("La cantidad debe ser mayor a 0.")
+
+    descuento = case(cantidades, value=Producto.id)
+    descontados = db.session.scalars(
+        update(Producto)
+        .where(Producto.id.in_(cantidades), Producto.stock >= descuento)
+        .values(stock=Producto.stock - descuento)
+        .returning(Producto.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    sin_stock = sorted(set(cantidades) - set(descontados))
+    if not sin_stock:
+        registrar_movimientos([(producto_id, -cantidad, motivo) for producto_id, cantidad in cantidades.items()])
+    return sin_stock
+
+
+def consulta_historial(producto_id, desde=None, hasta=None, entidad=HistorialStock):
+    """Movimientos de un producto, del más reciente al más antiguo; desde inclusive, hasta exclusivo.
+
+    `entidad` es HistorialStock o una de sus tablas de archivo (ver archivo.entidades).
+    """
+    consulta = db.session.query(entidad).filter(entidad.producto_id == producto_id, entidad.fecha.isnot(None))
+    if desde is not None:
+        consulta = consulta.filter(entidad.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.filter(entidad.fecha < hasta)
+    return consulta.order_by(entidad.fecha.desc(), entidad.id.desc())
+
+
+def consulta_stock_en(momento):
+    """Subconsulta (producto_id, stock, precio) con el stock de todos los productos en `momento`.
+
+    Parte del último corte de cada producto con fecha <= momento y suma solo
+    los movimientos posteriores (todo el historial si el producto no tiene cortes).
+    precio es el guardado en ese corte (NULL si no hay corte o no lo guardó).
+    """
+    ultimo = (
+        select(CorteStock.producto_id, func.max(CorteStock.fecha).label('fecha'))
+        .where(CorteStock.fecha <= momento)
+        .group_by(CorteStock.producto_id)
+        .subquery()
+    )
+    base = (
+        select(CorteStock.producto_id, CorteStock.fecha, CorteStock.stock, CorteStock.precio)
+        .join(ultimo, and_(CorteStock.producto_id == ultimo.c.producto_id, CorteStock.fecha == ultimo.c.fecha))
+        .subquery()
+    )
+    # archivar() guarda un corte de cada producto en la fecha límite: desde ella
+    # ningún producto necesita los movimientos archivados
+    limite = archivo.limite(HistorialStock)
+    desde = limite if limite is not None and momento >= limite else None
+    historial = archivo.fuente(HistorialStock, desde, momento)
+    cambios = (
+        select(historial.producto_id, func.sum(historial.cantidad_cambiada).label('cambio'))
+        .outerjoin(base, base.c.producto_id == historial.producto_id)
+        .where(historial.fecha <= momento, or_(base.c.fecha.is_(None), historial.fecha > base.c.fecha))
+        .group_by(historial.producto_id)
+        .subquery()
+    )
+    return (
+        select(
+            Producto.id.label('producto_id'),
+            (func.coalesce(base.c.stock, 0) + func.coalesce(cambios.c.cambio, 0)).label('stock'),
+            base.c.precio.label('precio'),
+        )
+        .outerjoin(base, base.c.producto_id == Producto.id)
+        .outerjoin(cambios, cambios.c.producto_id == Producto.id)
+        .subquery('stock_en')
+    )
+
+
+def stock_en(producto_id, momento):
+    """Stock de un producto en un momento dado (UTC).
+
+    Lee el último corte por el índice único (producto_id, fecha) y suma los
+    movimientos entre ese corte y `momento` por ix_historial_stock_producto_fecha:
+    el costo depende de los movimientos desde el corte, no del historial completo.
+    """
+    corte = db.session.execute(
+        select(CorteStock.fecha, CorteStock.stock)
+        .where(CorteStock.producto_id == producto_id, CorteStock.fecha <= momento)
+        .order_by(CorteStock.fecha.desc())
+        .limit(1)
+    ).first()
+
+    historial = archivo.fuente(HistorialStock, corte.fecha if corte is not None else None, momento)
+    cambios = select(func.coalesce(func.sum(historial.cantidad_cambiada), 0)).where(
+        historial.producto_id == producto_id, historial.fecha <= momento
+    )
+    if corte is not None:
+        cambios = cambios.where(historial.fecha > corte.fecha)
+    return (corte.stock if corte is not None else 0) + db.session.execute(cambios).scalar()
+
+
+def crear_cortes(momento=None):
+    """Guarda un corte con el stock de cada producto en `momento` (por defecto, el inicio del día UTC).
+
+    Cada corte guarda el precio vigente al crearlo y el stock valorizado, así
+    el reporte de stock de un día pasado no depende de los precios actuales.
+    Se omiten los productos que ya tienen un corte en ese momento. Devuelve la
+    cantidad de cortes creados; quien llama hace el commit.
+    """
+    if momento is None:
+        hoy = datetime.utcnow()
+        momento = datetime(hoy.year, hoy.month, hoy.day)
+
+    stock_en_momento = consulta_stock_en(momento)
+    ya_cortado = exists().where(CorteStock.producto_id == stock_en_momento.c.producto_id,
+                                CorteStock.fecha == momento)
+    filas = (
+        select(
+            stock_en_momento.c.producto_id,
+            literal(momento, db.DateTime),
+            stock_en_momento.c.stock,
+            Producto.precio,
+            stock_en_momento.c.stock * Producto.precio,
+        )
+        .join(Producto, Producto.id == stock_en_momento.c.producto_id)
+        .where(~ya_cortado)
+    )
+
+    resultado = db.session.execute(
+        insert(CorteStock).from_select(['producto_id', 'fecha', 'stock', 'precio', 'valor'], filas)
+    )
+    return resultado.rowcount
+
+
+def consulta_valuacion(momento):
+    """Consulta (id, nombre, stock, precio, valor) con el stock valorizado en `momento`.
+
+    Si hay cortes en ese momento (el corte nocturno) se leen tal cual, con el
+    precio de ese día y sin tocar producto ni historial_stock. Si no, el stock
+    se calcula desde el último corte anterior más los movimientos posteriores
+    y se valoriza con el precio de ese corte; solo los productos sin ningún
+    corte anterior usan el precio actual.
+    """
+    hay_cortes = db.session.execute(select(exists().where(CorteStock.fecha == momento))).scalar()
+    if hay_cortes:
+        precio = func.coalesce(CorteStock.precio, Producto.precio)
+        return (
+            select(
+                Producto.id.label('id'),
+                Producto.nombre.label('nombre'),
+                CorteStock.stock.label('stock'),
+                precio.label('precio'),
+                func.coalesce(CorteStock.valor, CorteStock.stock * precio).label('valor'),
+            )
+            .join(Producto, Producto.id == CorteStock.producto_id)
+            .where(CorteStock.fecha == momento)
+            .order_by(Producto.nombre, Producto.id)
+        )
+
+    stock_en_momento = consulta_stock_en(momento)
+    precio = func.coalesce(stock_en_momento.c.precio, Producto.precio)
+    return (
+        select(
+            Producto.id.label('id'),
+            Producto.nombre.label('nombre'),
+            stock_en_momento.c.stock.label('stock'),
+            precio.label('precio'),
+            (stock_en_momento.c.stock * precio).label('valor'),
+        )
+        .join(stock_en_momento, stock_en_momento.c.producto_id == Producto.id)
+        .order_by(Producto.nombre, Producto.id)
+    )
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Instrumentación por petición: cantidad de consultas SQL y tiempo en base de
+# datos, en plantillas y en PDF, acumulados por endpoint. Se activa con
+# METRICAS_HABILITADAS y se expone en formato Prometheus desde /metrics.
+# Los acumulados son por proceso: con varios workers cada uno reporta los suyos.
+
+logger = logging.getLogger('veterinaria.metricas')
+
+CAMPOS = ('peticiones', 'consultas', 'segundos_bd', 'segundos_plantillas', 'segundos_pdf', 'segundos_total')
+
+_acumulados = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+_bloqueo = threading.Lock()
+_config = {'habilitadas': False, 'consulta_lenta': 0.2, 'parametros_ocultos': ('password', 'username')}
+
+# Largo máximo de un valor y conjuntos de parámetros (executemany) que se escriben en el log
+LARGO_MAXIMO_PARAMETRO = 40
+MAXIMO_CONJUNTOS_EN_LOG = 3
+
+
+def _midiendo():
+    return _config['habilitadas'] and has_request_context() and 'metricas' in g
+
+
+def _antes_de_consulta(conexion, cursor, sql, parametros, contexto, executemany):
+    if _midiendo():
+        conexion.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_consulta(conexion, cursor, sql, parametros, contexto, executemany):
+    if not _midiendo() or not conexion.info.get('metricas_inicio'):
+        return
+    duracion = time.perf_counter() - conexion.info['metricas_inicio'].pop()
+    g.metricas['consultas'] += 1
+    g.metricas['segundos_bd'] += duracion
+    if duracion >= _config['consulta_lenta']:
+        logger.warning("Consulta lenta (%.1f ms) en %s: %s | parámetros: %r",
+                       duracion * 1000, request.endpoint, sql, _parametros_para_log(contexto))
+
+
+def _ocultar(nombre, valor):
+    if any(parte in nombre.lower() for parte in _config['parametros_ocultos']):
+        return '***'
+    if isinstance(valor, (str, bytes)) and len(valor) > LARGO_MAXIMO_PARAMETRO:
+        return valor[:LARGO_MAXIMO_PARAMETRO] + '…'
+    return valor
+
+
+def _parametros_para_log(contexto):
+    # Se leen por nombre (compiled_parameters) y no los que recibe el driver, que en
+    # SQLite son posicionales: así se reconoce p. ej. password_hash y se oculta
+    conjuntos = getattr(contexto, 'compiled_parameters', None) or []
+    registro = [{nombre: _ocultar(nombre, valor) for nombre, valor in conjunto.items()}
+                for conjunto in conjuntos[:MAXIMO_CONJUNTOS_EN_LOG]]
+    if len(conjuntos) > MAXIMO_CONJUNTOS_EN_LOG:
+        registro.append(f"... y {len(conjuntos) - MAXIMO_CONJUNTOS_EN_LOG} conjuntos más")
+    return registro
+
+
+def _antes_de_plantilla(app, template, context, **extra):
+    if _midiendo():
+        g.metricas_plantillas = getattr(g, 'metricas_plantillas', []) + [time.perf_counter()]
+
+
+def _plantilla_renderizada(app, template, context, **extra):
+    if _midiendo() and getattr(g, 'metricas_plantillas', None):
+        g.metricas['segundos_plantillas'] += time.perf_counter() - g.metricas_plantillas.pop()
+
+
+@contextmanager
+def medir(campo):
+    """Suma la duración del bloque al campo indicado de la petición actual (p. ej. 'segundos_pdf')."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _midiendo():
+            g.metricas[campo] += time.perf_counter() - inicio
+
+
+def _iniciar_peticion():
+    if _config['habilitadas']:
+        g.metricas = dict.fromkeys(CAMPOS, 0)
+        g.metricas_inicio = time.perf_counter()
+
+
+def _terminar_peticion(respuesta):
+    if _midiendo():
+        g.metricas['peticiones'] = 1
+        g.metricas['segundos_total'] = time.perf_counter() - g.metricas_inicio
+        endpoint = request.endpoint or 'desconocido'
+        with _bloqueo:
+            for campo, valor in g.metricas.items():
+                _acumulados[endpoint][campo] += valor
+    return respuesta
+
+
+def init_app(app):
+    _config['habilitadas'] = app.config.get('METRICAS_HABILITADAS', False)
+    _config['consulta_lenta'] = app.config.get('METRICAS_CONSULTA_LENTA_MS', 200) / 1000
+    _config['parametros_ocultos'] = tuple(parte.lower() for parte in app.config.get(
+        'METRICAS_PARAMETROS_OCULTOS', _config['parametros_ocultos']))
+    if not _config['habilitadas']:
+        return
+
+    # Aplica a todos los engines: así también cubre uno creado después (p. ej. en pruebas)
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_consulta):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+    before_render_template.connect(_antes_de_plantilla, app)
+    template_rendered.connect(_plantilla_renderizada, app)
+    app.before_request(_iniciar_peticion)
+    app.after_request(_terminar_peticion)
+
+
+def formato_prometheus():
+    """Devuelve los acumulados por endpoint en el formato de texto de Prometheus."""
+    metricas = [
+        ('veterinaria_http_peticiones_total', 'counter', 'Peticiones atendidas.', 'peticiones'),
+        ('veterinaria_http_segundos_total', 'counter', 'Tiempo total de las peticiones.', 'segundos_total'),
+        ('veterinaria_sql_consultas_total', 'counter', 'Consultas SQL ejecutadas.', 'consultas'),
+        ('veterinaria_sql_segundos_total', 'counter', 'Tiempo en la base de datos.', 'segundos_bd'),
+        ('veterinaria_plantillas_segundos_total', 'counter', 'Tiempo renderizando plantillas.', 'segundos_plantillas'),
+        ('veterinaria_pdf_segundos_total', 'counter', 'Tiempo generando PDF.', 'segundos_pdf'),
+    ]
+    with _bloqueo:
+        acumulados = {endpoint: dict(valores) for endpoint, valores in _acumulados.items()}
+
+    lineas = []
+    for nombre, tipo, ayuda, campo in metricas:
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for endpoint, valores in sorted(acumulados.items()):
+            lineas.append(f'{nombre}{{endpoint="{endpoint}"}} {valores[campo]:g}')
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,114 @@
+import io
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from models import db
+import archivo
+
+# Copia todos los datos de una base a otra (p. ej. de instance/veterinaria.db a
+# PostgreSQL). El esquema del destino debe existir: se crea antes con
+# `DATABASE_URL=<destino> flask db upgrade`. Las tablas se copian en orden de
+# dependencias (padres antes que hijos), leyendo el origen por lotes y
+# escribiéndolos con COPY cuando el destino es PostgreSQL con psycopg, o con
+# INSERT multi-fila en los demás casos. Todo ocurre en una sola transacción.
+# Las tablas de archivo (archivo.py) no están en los modelos ni en las
+# migraciones: se crean en el destino y se copian después de las demás.
+
+FILAS_POR_LOTE = 5000
+
+
+def _texto_copy(valor):
+    # Formato de texto de COPY: \N es NULL y se escapan barra invertida, tabulador y saltos de línea
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor)
+    return texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copiar_lote_copy(conexion, tabla, filas):
+    columnas = ', '.join(f'"{columna.name}"' for columna in tabla.columns)
+    sql = f'COPY "{tabla.name}" ({columnas}) FROM STDIN'
+    datos = ''.join('\t'.join(_texto_copy(valor) for valor in fila) + '\n' for fila in filas)
+
+    cursor = conexion.connection.driver_connection.cursor()
+    try:
+        if conexion.dialect.driver == 'psycopg2':
+            cursor.copy_expert(sql, io.StringIO(datos))
+        else:
+            with cursor.copy(sql) as copia:
+                copia.write(datos)
+    finally:
+        cursor.close()
+
+
+def _usa_copy(conexion):
+    return conexion.dialect.name == 'postgresql' and conexion.dialect.driver in ('psycopg2', 'psycopg')
+
+
+def _insertar_lote(conexion, tabla, filas):
+    if _usa_copy(conexion):
+        _copiar_lote_copy(conexion, tabla, filas)
+    else:
+        conexion.execute(tabla.insert(), [dict(fila._mapping) for fila in filas])
+
+
+def _ajustar_secuencias(conexion, tablas):
+    # COPY/INSERT con ids explícitos no avanzan las secuencias SERIAL de PostgreSQL
+    for tabla in tablas:
+        if 'id' not in tabla.primary_key.columns:
+            continue
+        conexion.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla.name}', 'id'), "
+            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM \"{tabla.name}\""
+        ))
+
+
+def copiar(url_origen, url_destino, vaciar=False, filas_por_lote=FILAS_POR_LOTE, informar=print):
+    """Copia todas las tablas de los modelos del origen al destino; devuelve {tabla: filas}."""
+    origen = create_engine(url_origen)
+    destino = create_engine(url_destino)
+    tablas = db.metadata.sorted_tables
+
+    inspector = inspect(destino)
+    faltantes = [tabla.name for tabla in tablas if not inspector.has_table(tabla.name)]
+    if faltantes:
+        raise ValueError(f"Faltan tablas en el destino ({', '.join(faltantes)}); ejecuta 'flask db upgrade' contra él.")
+
+    copiadas = {}
+    with origen.connect() as lectura, destino.begin() as escritura:
+        archivadas = archivo.tablas_en(lectura)
+        for tabla in archivadas:
+            tabla.create(escritura, checkfirst=True)
+        todas = tablas + archivadas
+
+        if vaciar:
+            for tabla in reversed(todas):
+                escritura.execute(tabla.delete())
+        else:
+            ocupadas = [t.name for t in todas if escritura.execute(select(func.count()).select_from(t)).scalar()]
+            if ocupadas:
+                raise ValueError(f"El destino ya tiene datos en {', '.join(ocupadas)}; usa --vaciar para reemplazarlos.")
+
+        for tabla in todas:
+            resultado = lectura.execution_options(yield_per=filas_por_lote).execute(
+                select(tabla).order_by(*tabla.primary_key.columns)
+            )
+            copiadas[tabla.name] = 0
+            for filas in resultado.partitions():
+                _insertar_lote(escritura, tabla, filas)
+                copiadas[tabla.name] += len(filas)
+            informar(f"{tabla.name}: {copiadas[tabla.name]} filas")
+
+        if escritura.dialect.name == 'postgresql':
+            _ajustar_secuencias(escritura, tablas)
+
+    origen.dispose()
+    destino.dispose()
+    return copiadas
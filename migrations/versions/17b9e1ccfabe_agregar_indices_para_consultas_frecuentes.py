@@ -0,0 +1,33 @@
+"""Agregar índices para las consultas frecuentes
+
+Revision ID: 17b9e1ccfabe
+Revises: e815288187f3
+Create Date: 2025-06-10 09:41:18.203554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '17b9e1ccfabe'
+down_revision = 'e815288187f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venta_producto_fecha', 'venta', ['producto_id', 'fecha'], unique=False)
+    op.create_index('ix_venta_fecha_id', 'venta', ['fecha', 'id'], unique=False)
+    op.create_index('ix_historial_stock_producto_fecha', 'historial_stock', ['producto_id', 'fecha'], unique=False)
+    op.create_index('ix_producto_categoria_id', 'producto', ['categoria_id'], unique=False)
+    op.create_index('ix_producto_stock_bajo', 'producto', ['stock'], unique=False,
+                    sqlite_where=sa.text('stock < 5'), postgresql_where=sa.text('stock < 5'))
+
+
+def downgrade():
+    op.drop_index('ix_producto_stock_bajo', table_name='producto')
+    op.drop_index('ix_producto_categoria_id', table_name='producto')
+    op.drop_index('ix_historial_stock_producto_fecha', table_name='historial_stock')
+    op.drop_index('ix_venta_fecha_id', table_name='venta')
+    op.drop_index('ix_venta_producto_fecha', table_name='venta')
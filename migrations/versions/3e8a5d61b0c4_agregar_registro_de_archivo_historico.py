@@ -0,0 +1,40 @@
+"""Agregar registro de archivo histórico
+
+Revision ID: 3e8a5d61b0c4
+Revises: 9b1f3c7d2e40
+Create Date: 2025-06-30 10:12:47.903561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8a5d61b0c4'
+down_revision = '9b1f3c7d2e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archivo_historico',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tabla', sa.String(length=50), nullable=False),
+    sa.Column('anio', sa.Integer(), nullable=False),
+    sa.Column('filas', sa.Integer(), nullable=False),
+    sa.Column('hasta', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tabla', 'anio', name='uq_archivo_historico_tabla_anio')
+    )
+
+
+def downgrade():
+    # Sin el registro las tablas de archivo quedarían invisibles: sus filas vuelven a la tabla de origen
+    conexion = op.get_bind()
+    for tabla, anio in conexion.execute(sa.text("SELECT tabla, anio FROM archivo_historico")).all():
+        archivada = f"{tabla}_archivo_{anio}"
+        columnas = ', '.join(columna['name'] for columna in sa.inspect(conexion).get_columns(archivada))
+        op.execute(f"INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM {archivada}")
+        op.drop_table(archivada)
+    op.drop_table('archivo_historico')
@@ -0,0 +1,35 @@
+"""Normalizar el formato de las fechas en SQLite
+
+Revision ID: 5d2c8e7a4f19
+Revises: 3e8a5d61b0c4
+Create Date: 2025-07-02 11:05:19.264830
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8e7a4f19'
+down_revision = '3e8a5d61b0c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las filas creadas con CURRENT_TIMESTAMP quedaron como 'AAAA-MM-DD HH:MM:SS' y las
+    # creadas desde Python como 'AAAA-MM-DD HH:MM:SS.ffffff'. SQLite compara las fechas
+    # como texto, así que la paginación por (fecha, id) necesita un solo formato.
+    # En PostgreSQL las fechas son timestamp y no hay nada que corregir.
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    tablas = ['venta', 'historial_stock', 'alerta_stock']
+    filas = op.get_bind().execute(sa.text("SELECT tabla, anio FROM archivo_historico"))
+    tablas += [f"{tabla}_archivo_{anio}" for tabla, anio in filas]
+    for tabla in tablas:
+        op.execute(f"UPDATE {tabla} SET fecha = fecha || '.000000' WHERE length(fecha) = 19")
+
+
+def downgrade():
+    # El formato con microsegundos es válido para todas las versiones anteriores
+    pass
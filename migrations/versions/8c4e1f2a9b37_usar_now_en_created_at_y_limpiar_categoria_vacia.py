@@ -0,0 +1,36 @@
+"""Usar now() en created_at y limpiar categoria_id vacío
+
+Revision ID: 8c4e1f2a9b37
+Revises: 5d2c8e7a4f19
+Create Date: 2025-07-04 10:12:41.581204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e1f2a9b37'
+down_revision = '5d2c8e7a4f19'
+branch_labels = None
+depends_on = None
+
+TABLAS_CON_TIMESTAMPS = ['categoria', 'historial_stock', 'producto', 'usuario', 'venta']
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'sqlite':
+        # 0cd8da9dfad5 dejó el literal '(CURRENT_TIMESTAMP)'; los modelos declaran func.now()
+        for tabla in TABLAS_CON_TIMESTAMPS:
+            op.alter_column(tabla, 'created_at', server_default=sa.func.now())
+        return
+    # El formulario de agregar producto guardaba '' cuando no se elegía categoría.
+    # SQLite lo acepta en una columna entera; PostgreSQL no, y tampoco lo copiaría.
+    op.execute("UPDATE producto SET categoria_id = NULL WHERE categoria_id = ''")
+    op.execute("UPDATE venta_resumen_diario SET categoria_id = NULL WHERE categoria_id = ''")
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'sqlite':
+        for tabla in TABLAS_CON_TIMESTAMPS:
+            op.alter_column(tabla, 'created_at', server_default=sa.text('(CURRENT_TIMESTAMP)'))
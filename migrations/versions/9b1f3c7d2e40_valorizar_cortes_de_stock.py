@@ -0,0 +1,36 @@
+"""Valorizar los cortes de stock
+
+Revision ID: 9b1f3c7d2e40
+Revises: c64190e58934
+Create Date: 2025-06-23 09:41:12.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f3c7d2e40'
+down_revision = 'c64190e58934'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('corte_stock', sa.Column('precio', sa.Float(), nullable=True))
+    op.add_column('corte_stock', sa.Column('valor', sa.Float(), nullable=True))
+    op.create_index('ix_corte_stock_fecha', 'corte_stock', ['fecha'], unique=False)
+
+    # Los cortes anteriores no guardaron el precio: se valorizan con el precio actual
+    op.execute("""
+        UPDATE corte_stock
+        SET precio = (SELECT producto.precio FROM producto WHERE producto.id = corte_stock.producto_id),
+            valor = stock * (SELECT producto.precio FROM producto WHERE producto.id = corte_stock.producto_id)
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_corte_stock_fecha', table_name='corte_stock')
+    # DROP COLUMN directo (SQLite >= 3.35), igual que en c64190e58934
+    op.drop_column('corte_stock', 'valor')
+    op.drop_column('corte_stock', 'precio')
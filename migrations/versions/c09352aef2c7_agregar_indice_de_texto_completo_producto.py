@@ -0,0 +1,56 @@
+"""Agregar índice de texto completo (FTS5) para producto.nombre
+
+Revision ID: c09352aef2c7
+Revises: 17b9e1ccfabe
+Create Date: 2025-06-12 17:25:06.841390
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c09352aef2c7'
+down_revision = '17b9e1ccfabe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 es exclusivo de SQLite
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE producto_fts USING fts5(
+            nombre, content='producto', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER producto_fts_ai AFTER INSERT ON producto BEGIN
+            INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER producto_fts_ad AFTER DELETE ON producto BEGIN
+            INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER producto_fts_au AFTER UPDATE OF nombre ON producto BEGIN
+            INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+            INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+        END
+    """)
+    # Indexar los productos existentes
+    op.execute("INSERT INTO producto_fts(producto_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS producto_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS producto_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS producto_fts_ai")
+    op.execute("DROP TABLE IF EXISTS producto_fts")
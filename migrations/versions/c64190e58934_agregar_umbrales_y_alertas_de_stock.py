@@ -0,0 +1,51 @@
+"""Agregar umbrales de reposición y alertas de stock
+
+Revision ID: c64190e58934
+Revises: fce25ff698e6
+Create Date: 2025-06-19 12:08:33.905716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c64190e58934'
+down_revision = 'fce25ff698e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # add_column sin batch: en SQLite no recrea la tabla producto ni borra los triggers FTS
+    op.add_column('producto', sa.Column('umbral_reposicion', sa.Integer(), nullable=True))
+    op.add_column('categoria', sa.Column('umbral_reposicion', sa.Integer(), nullable=True))
+
+    op.create_table('alerta_stock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('umbral', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['producto_id'], ['producto.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('producto_id')
+    )
+
+    # Alertas de los productos que ya están bajo el umbral por defecto
+    op.execute("""
+        INSERT INTO alerta_stock (producto_id, stock, umbral, fecha)
+        SELECT id, stock, 5, CURRENT_TIMESTAMP FROM producto WHERE stock < 5
+    """)
+
+    # El reporte ya no recorre producto por stock: lee alerta_stock
+    op.drop_index('ix_producto_stock_bajo', table_name='producto')
+
+
+def downgrade():
+    op.create_index('ix_producto_stock_bajo', 'producto', ['stock'], unique=False,
+                    sqlite_where=sa.text('stock < 5'), postgresql_where=sa.text('stock < 5'))
+    op.drop_table('alerta_stock')
+    # DROP COLUMN directo (SQLite >= 3.35) para no recrear producto y perder los triggers FTS
+    op.drop_column('categoria', 'umbral_reposicion')
+    op.drop_column('producto', 'umbral_reposicion')
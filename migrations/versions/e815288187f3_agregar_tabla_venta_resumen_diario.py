@@ -0,0 +1,44 @@
+"""Agregar tabla venta_resumen_diario
+
+Revision ID: e815288187f3
+Revises: f15b3d801950
+Create Date: 2025-06-04 16:02:51.377120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e815288187f3'
+down_revision = 'f15b3d801950'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('venta_resumen_diario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.Column('categoria_id', sa.Integer(), nullable=True),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['categoria_id'], ['categoria.id'], ),
+    sa.ForeignKeyConstraint(['producto_id'], ['producto.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('fecha', 'producto_id', name='uq_venta_resumen_diario_fecha_producto')
+    )
+
+    # Cargar el resumen con las ventas ya registradas
+    op.execute("""
+        INSERT INTO venta_resumen_diario (fecha, producto_id, categoria_id, unidades, total)
+        SELECT date(venta.fecha), venta.producto_id, producto.categoria_id, SUM(venta.cantidad), SUM(venta.total)
+        FROM venta
+        JOIN producto ON producto.id = venta.producto_id
+        GROUP BY date(venta.fecha), venta.producto_id, producto.categoria_id
+    """)
+
+
+def downgrade():
+    op.drop_table('venta_resumen_diario')
@@ -0,0 +1,40 @@
+"""Agregar precio_unitario y total a la tabla venta
+
+Revision ID: f15b3d801950
+Revises: e5077ad4c83b
+Create Date: 2025-06-02 10:14:37.512903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f15b3d801950'
+down_revision = 'e5077ad4c83b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('venta', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('precio_unitario', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('total', sa.Float(), nullable=True))
+
+    # Rellenar las ventas existentes con el precio actual del producto
+    op.execute("""
+        UPDATE venta
+        SET precio_unitario = (SELECT producto.precio FROM producto WHERE producto.id = venta.producto_id)
+    """)
+    op.execute("UPDATE venta SET precio_unitario = 0 WHERE precio_unitario IS NULL")
+    op.execute("UPDATE venta SET total = cantidad * precio_unitario")
+
+    with op.batch_alter_table('venta', schema=None) as batch_op:
+        batch_op.alter_column('precio_unitario', existing_type=sa.Float(), nullable=False)
+        batch_op.alter_column('total', existing_type=sa.Float(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('venta', schema=None) as batch_op:
+        batch_op.drop_column('total')
+        batch_op.drop_column('precio_unitario')
@@ -0,0 +1,62 @@
+"""Agregar cortes de stock y completar el historial de stock
+
+Revision ID: fce25ff698e6
+Revises: c09352aef2c7
+Create Date: 2025-06-16 10:22:47.610283
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fce25ff698e6'
+down_revision = 'c09352aef2c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('corte_stock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['producto_id'], ['producto.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('producto_id', 'fecha', name='uq_corte_stock_producto_fecha')
+    )
+
+    # Las ventas no se registraban en el historial: se agregan como movimientos
+    op.execute("""
+        INSERT INTO historial_stock (producto_id, cantidad_cambiada, motivo, fecha)
+        SELECT venta.producto_id, -venta.cantidad, 'Venta', COALESCE(venta.fecha, venta.created_at, CURRENT_TIMESTAMP)
+        FROM venta
+        JOIN producto ON producto.id = venta.producto_id
+        WHERE venta.cantidad <> 0
+    """)
+
+    # Saldo inicial: lo que falta para que la suma del historial sea el stock actual
+    # (cargas por planilla y stock inicial nunca quedaron registrados)
+    op.execute("""
+        INSERT INTO historial_stock (producto_id, cantidad_cambiada, motivo, fecha)
+        SELECT producto.id,
+               producto.stock - COALESCE(movimientos.suma, 0),
+               'Saldo inicial',
+               CASE WHEN movimientos.primera IS NULL OR producto.created_at < movimientos.primera
+                    THEN COALESCE(producto.created_at, CURRENT_TIMESTAMP)
+                    ELSE movimientos.primera END
+        FROM producto
+        LEFT JOIN (
+            SELECT producto_id, SUM(cantidad_cambiada) AS suma, MIN(fecha) AS primera
+            FROM historial_stock
+            GROUP BY producto_id
+        ) AS movimientos ON movimientos.producto_id = producto.id
+        WHERE producto.stock - COALESCE(movimientos.suma, 0) <> 0
+    """)
+
+
+def downgrade():
+    op.execute("DELETE FROM historial_stock WHERE motivo IN ('Venta', 'Saldo inicial')")
+    op.drop_table('corte_stock')
@@ -1,3 +1,4 @@
+from flask import current_app
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -15,20 +16,32 @@ class Usuario(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, onupdate=func.now())
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, metodo=None):
+        # El método (y su costo) se configura en PASSWORD_HASH_METODO
+        metodo = metodo or current_app.config.get('PASSWORD_HASH_METODO', 'scrypt')
+        self.password_hash = generate_password_hash(password, method=metodo)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+# Umbral de reposición cuando ni el producto ni su categoría definen uno
+UMBRAL_STOCK_BAJO = 5
+
 class Producto(db.Model):
+    __table_args__ = (
+        db.Index('ix_producto_categoria_id', 'categoria_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     precio = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     categoria_id = db.Column(db.Integer, db.ForeignKey('categoria.id'), nullable=True)
+    umbral_reposicion = db.Column(db.Integer, nullable=True)  # None = el de la categoría
     ventas = db.relationship('Venta', backref='producto', cascade="all, delete-orphan")
+    resumenes_diarios = db.relationship('VentaResumenDiario', backref='producto', cascade="all, delete-orphan")
     historial_stock = db.relationship('HistorialStock', backref='producto', cascade="all, delete-orphan")
+    cortes_stock = db.relationship('CorteStock', backref='producto', cascade="all, delete-orphan")
+    alerta_stock = db.relationship('AlertaStock', backref='producto', uselist=False, cascade="all, delete-orphan")
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, onupdate=func.now())
 
@@ -52,10 +65,19 @@ class Producto(db.Model):
 
 
 class Venta(db.Model):
+    __table_args__ = (
+        db.Index('ix_venta_producto_fecha', 'producto_id', 'fecha'),
+        db.Index('ix_venta_fecha_id', 'fecha', 'id'),  # Paginación por cursor y rangos de fechas
+    )
     id = db.Column(db.Integer, primary_key=True)
     producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
     cantidad = db.Column(db.Integer, nullable=False)
-    fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Precio del producto al momento de la venta y total de la línea
+    precio_unitario = db.Column(db.Float, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    # Asignada en Python (UTC) y no con CURRENT_TIMESTAMP: en SQLite todas las fechas quedan
+    # como 'AAAA-MM-DD HH:MM:SS.ffffff', el mismo texto que los parámetros del cursor de paginacion.py
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, onupdate=func.now())
 
@@ -65,13 +87,32 @@ class Venta(db.Model):
             raise ValueError("La cantidad debe ser mayor a 0.")
         return value
 
+    @validates('precio_unitario')
+    def validate_precio_unitario(self, key, value):
+        if value < 0:
+            raise ValueError("El precio no puede ser negativo.")
+        return value
+
+
+class VentaResumenDiario(db.Model):
+    # Ventas acumuladas por día y producto, mantenidas en cada venta
+    __tablename__ = 'venta_resumen_diario'
+    __table_args__ = (db.UniqueConstraint('fecha', 'producto_id', name='uq_venta_resumen_diario_fecha_producto'),)
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria.id'), nullable=True)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+
 
 class HistorialStock(db.Model):
+    __table_args__ = (db.Index('ix_historial_stock_producto_fecha', 'producto_id', 'fecha'),)
     id = db.Column(db.Integer, primary_key=True)
     producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
     cantidad_cambiada = db.Column(db.Integer, nullable=False)
     motivo = db.Column(db.String(255), nullable=False)
-    fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, onupdate=func.now())
 
@@ -87,9 +128,50 @@ class HistorialStock(db.Model):
             raise ValueError("El motivo no puede estar vacío.")
         return value
 
+class CorteStock(db.Model):
+    # Stock de cada producto en un instante, calculado desde historial_stock.
+    # El stock en un momento T es el último corte anterior a T más los
+    # movimientos posteriores al corte, sin recorrer todo el historial.
+    # El corte nocturno guarda además el precio del día y el stock valorizado.
+    __tablename__ = 'corte_stock'
+    __table_args__ = (
+        db.UniqueConstraint('producto_id', 'fecha', name='uq_corte_stock_producto_fecha'),
+        db.Index('ix_corte_stock_fecha', 'fecha'),  # Reporte de stock al cierre de un día
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False)
+    stock = db.Column(db.Integer, nullable=False)
+    precio = db.Column(db.Float, nullable=True)
+    valor = db.Column(db.Float, nullable=True)  # stock * precio
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+class AlertaStock(db.Model):
+    # Una fila por producto mientras su stock esté bajo el umbral de reposición;
+    # se crea y se borra al registrar cada movimiento (ver alertas.py)
+    __tablename__ = 'alerta_stock'
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False, unique=True)
+    stock = db.Column(db.Integer, nullable=False)
+    umbral = db.Column(db.Integer, nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivoHistorico(db.Model):
+    # Una fila por tabla de archivo (venta_archivo_AAAA, historial_stock_archivo_AAAA):
+    # el año que guarda, cuántas filas tiene y hasta qué fecha se archivó (ver archivo.py)
+    __tablename__ = 'archivo_historico'
+    __table_args__ = (db.UniqueConstraint('tabla', 'anio', name='uq_archivo_historico_tabla_anio'),)
+    id = db.Column(db.Integer, primary_key=True)
+    tabla = db.Column(db.String(50), nullable=False)  # Tabla de origen: 'venta' o 'historial_stock'
+    anio = db.Column(db.Integer, nullable=False)
+    filas = db.Column(db.Integer, nullable=False, default=0)
+    hasta = db.Column(db.DateTime, nullable=False)  # Las filas archivadas tienen fecha < hasta
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Categoria(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False, unique=True)
+    umbral_reposicion = db.Column(db.Integer, nullable=True)  # None = UMBRAL_STOCK_BAJO
     productos = db.relationship('Producto', backref='categoria', lazy=True)
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, onupdate=func.now())
@@ -0,0 +1,109 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import contains_eager
+
+from models import db, Venta, Producto, HistorialStock
+import archivo
+import busqueda
+import inventario
+
+# Límites del tamaño de página para los listados de ventas y de movimientos de stock
+VENTAS_POR_PAGINA = 50
+MAX_VENTAS_POR_PAGINA = 200
+
+
+class Pagina:
+    def __init__(self, items, siguiente, limite):
+        self.items = items
+        self.siguiente = siguiente  # Cursor de la página siguiente (None si es la última)
+        self.limite = limite
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def codificar_cursor(venta):
+    # La fecha vuelve como datetime y se compara como parámetro; funciona porque todas
+    # las fechas se guardan con el mismo formato (ver Venta.fecha en models.py)
+    valor = f"{venta.fecha.isoformat()}|{venta.id}"
+    return base64.urlsafe_b64encode(valor.encode("UTF-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor):
+    # Un cursor inválido se trata como "primera página"
+    try:
+        valor = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("UTF-8")
+        fecha, venta_id = valor.split("|")
+        return datetime.fromisoformat(fecha), int(venta_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+def normalizar_limite(limite):
+    try:
+        limite = int(limite)
+    except (TypeError, ValueError):
+        return VENTAS_POR_PAGINA
+    return max(1, min(limite, MAX_VENTAS_POR_PAGINA))
+
+
+def consulta_ventas(search=None, posicion=None, entidad=Venta):
+    """Consulta base de los listados de ventas, ordenada de la más reciente a la más antigua.
+
+    `entidad` es Venta o una de sus tablas de archivo (ver archivo.entidades).
+    """
+    # El producto se carga en la misma consulta para evitar un SELECT por venta
+    query = (
+        db.session.query(entidad)
+        .join(Producto, entidad.producto_id == Producto.id)
+        .options(contains_eager(entidad.producto))
+        .filter(entidad.fecha.isnot(None))
+    )
+    if search:
+        query = query.filter(busqueda.filtro_nombre(search))
+    if posicion:
+        query = query.filter(tuple_(entidad.fecha, entidad.id) < posicion)
+    return query.order_by(entidad.fecha.desc(), entidad.id.desc())
+
+
+def paginar_ventas(search=None, cursor=None, limite=None):
+    """Devuelve una página de ventas ordenadas de la más reciente a la más antigua.
+
+    La paginación es por cursor sobre (fecha, id), de modo que el costo de cada
+    página depende solo de su tamaño y no del total de ventas registradas.
+    Cuando la tabla venta se agota, la página sigue en el archivo.
+    """
+    limite = normalizar_limite(limite)
+    posicion = decodificar_cursor(cursor) if cursor else None
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    ventas = []
+    for entidad in archivo.entidades(Venta):
+        ventas += consulta_ventas(search, posicion, entidad).limit(limite + 1 - len(ventas)).all()
+        if len(ventas) > limite:
+            break
+    siguiente = codificar_cursor(ventas[limite - 1]) if len(ventas) > limite else None
+    return Pagina(ventas[:limite], siguiente, limite)
+
+
+def paginar_historial(producto_id, desde=None, hasta=None, cursor=None, limite=None):
+    """Página de movimientos de stock de un producto, del más reciente al más antiguo."""
+    limite = normalizar_limite(limite)
+    posicion = decodificar_cursor(cursor) if cursor else None
+
+    movimientos = []
+    for entidad in archivo.entidades(HistorialStock, desde, hasta):
+        consulta = inventario.consulta_historial(producto_id, desde, hasta, entidad)
+        if posicion:
+            consulta = consulta.filter(tuple_(entidad.fecha, entidad.id) < posicion)
+        movimientos += consulta.limit(limite + 1 - len(movimientos)).all()
+        if len(movimientos) > limite:
+            break
+    siguiente = codificar_cursor(movimientos[limite - 1]) if len(movimientos) > limite else None
+    return Pagina(movimientos[:limite], siguiente, limite)
@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+import inventario
+
+# Corte nocturno dentro del proceso: un hilo duerme hasta pasada la medianoche
+# UTC y guarda el stock valorizado de cada producto al inicio del día (ver
+# inventario.crear_cortes). Las ventas por día y producto ya quedan en
+# venta_resumen_diario con cada venta, así que los reportes de días cerrados
+# se leen de esas dos tablas sin recorrer venta, producto ni historial_stock.
+#
+# Se activa con CORTES_PROGRAMADOS=1. Con varios workers cada uno tiene su
+# hilo: el corte es idempotente y el que llega segundo no crea nada. Sin el
+# programador, el mismo trabajo se corre desde cron con `flask cortar-stock`.
+
+
+def ejecutar_corte(momento=None):
+    """Crea y confirma los cortes de `momento` (por defecto, el inicio del día UTC)."""
+    try:
+        cortes = inventario.crear_cortes(momento)
+        db.session.commit()
+    except IntegrityError:
+        # Otro worker confirmó el mismo corte entre la lectura y el INSERT
+        db.session.rollback()
+        cortes = 0
+    return cortes
+
+
+def _segundos_hasta_el_proximo_corte(minutos_despues):
+    ahora = datetime.utcnow()
+    manana = datetime(ahora.year, ahora.month, ahora.day) + timedelta(days=1)
+    return (manana + timedelta(minutes=minutos_despues) - ahora).total_seconds()
+
+
+def _correr(app):
+    with app.app_context():
+        try:
+            cortes = ejecutar_corte()
+            app.logger.info("Corte de stock: %s productos.", cortes)
+        except Exception:
+            app.logger.exception("Falló el corte de stock programado.")
+        finally:
+            db.session.remove()
+
+
+def init_app(app):
+    if not app.config['CORTES_PROGRAMADOS']:
+        return
+
+    def bucle():
+        _correr(app)  # Recupera el corte de hoy si el servidor estaba apagado a medianoche
+        while True:
+            time.sleep(_segundos_hasta_el_proximo_corte(app.config['CORTES_MINUTOS_DESPUES']))
+            _correr(app)
+
+    threading.Thread(target=bucle, name='corte-nocturno', daemon=True).start()
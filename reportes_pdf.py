@@ -0,0 +1,169 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app, render_template
+from sqlalchemy import func, select
+
+from models import db, Producto
+import agregaciones
+import inventario
+import trabajos
+
+# Reportes en PDF por tramos. Las filas se leen con un cursor del lado del
+# servidor de a PDF_FILAS_POR_TRAMO, cada tramo se guarda como archivo y el
+# pool de trabajos.py los convierte en paralelo y los une en un solo PDF.
+# xhtml2pdf se vuelve muy lento con tablas largas; con tramos fijos el costo
+# crece en línea con las filas y ningún proceso tiene el reporte completo.
+#
+# Motores (PDF_MOTOR_TABLAS):
+#   'xhtml2pdf'  cada tramo se renderiza con la plantilla HTML del reporte
+#   'reportlab'  cada tramo se escribe directo como tabla, sin HTML (más rápido)
+
+
+def _consulta_stock(desde=None, hasta=None):
+    # Con `hasta`, el stock valorizado al cierre de ese día (corte nocturno)
+    if hasta is not None:
+        return inventario.consulta_valuacion(hasta)
+    return (
+        select(
+            Producto.nombre.label('nombre'),
+            Producto.stock.label('stock'),
+            Producto.precio.label('precio'),
+            (Producto.stock * Producto.precio).label('valor'),
+        )
+        .order_by(Producto.nombre, Producto.id)
+    )
+
+
+def _total_stock(desde=None, hasta=None):
+    valuacion = _consulta_stock(desde, hasta).subquery()
+    return db.session.execute(select(func.coalesce(func.sum(valuacion.c.valor), 0))).scalar()
+
+
+def describir_periodo(desde=None, hasta=None):
+    # hasta es exclusivo (el día siguiente al último incluido)
+    if hasta is not None:
+        hasta = hasta - timedelta(days=1)
+    if desde is not None and hasta is not None:
+        return f"Del {desde:%d/%m/%Y} al {hasta:%d/%m/%Y}"
+    if desde is not None:
+        return f"Desde el {desde:%d/%m/%Y}"
+    if hasta is not None:
+        return f"Hasta el {hasta:%d/%m/%Y}"
+    return None
+
+
+# reporte -> definición. Las columnas son (encabezado, atributo de la fila, es un monto);
+# la consulta y el total reciben el rango (desde, hasta)
+REPORTES = {
+    'stock': {
+        'titulo': 'Reporte de Stock',
+        'plantilla': 'reporte_stock_pdf.html',
+        'variable': 'productos',
+        'columnas': [('Producto', 'nombre', False), ('Stock Disponible', 'stock', False),
+                     ('Precio Unitario', 'precio', True), ('Valor Total', 'valor', True)],
+        'consulta': _consulta_stock,
+        'total': ('total_stock', 'Valor Total del Stock', _total_stock),
+    },
+    'ventas': {
+        'titulo': 'Reporte de Ventas',
+        'plantilla': 'reporte_ventas_pdf.html',
+        'variable': 'ventas_por_producto',
+        'columnas': [('Producto', 'nombre', False), ('Cantidad Vendida', 'unidades', False),
+                     ('Total', 'total', True)],
+        'consulta': agregaciones.consulta_ventas_por_producto,
+        'total': ('total_ventas', 'Total de Ventas', agregaciones.total_ventas),
+    },
+}
+
+# Datos del local que encabezan cada reporte
+LINEAS_ENCABEZADO = ['Veterinaria XXX', 'Dirección: Calle Falsa 123, Ciudad', 'Teléfono: +569 XXXXXXX']
+
+
+def _tramos(consulta, filas_por_tramo):
+    # (filas, es el primero, es el último): se lee un tramo por adelantado para saber cuál es el último
+    resultado = db.session.execute(consulta.execution_options(yield_per=filas_por_tramo))
+    anterior, primero = [], True
+    for particion in resultado.partitions():
+        if anterior:
+            yield anterior, primero, False
+            primero = False
+        anterior = particion
+    yield anterior, primero, True
+
+
+def _escribir(ruta, contenido):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        archivo.write(contenido)
+
+
+def escribir_tramos(reporte, carpeta, prefijo, motor='xhtml2pdf', filas_por_tramo=500, desde=None, hasta=None):
+    """Escribe los tramos del reporte en `carpeta` y devuelve (conversor, rutas de los tramos)."""
+    if motor not in ('xhtml2pdf', 'reportlab'):
+        raise ValueError(f"Motor de PDF desconocido: {motor}")
+    definicion = REPORTES[reporte]
+    variable_total, etiqueta_total, calcular_total = definicion['total']
+    total = calcular_total(desde, hasta)
+    ahora = datetime.now()
+    periodo = describir_periodo(desde, hasta)
+
+    entradas = []
+    consulta = definicion['consulta'](desde, hasta)
+    for numero, (filas, primero, ultimo) in enumerate(_tramos(consulta, filas_por_tramo)):
+        if motor == 'reportlab':
+            ruta = trabajos.ruta_tramo(carpeta, prefijo, numero, 'json')
+            tramo = {
+                'encabezados': [encabezado for encabezado, _, _ in definicion['columnas']],
+                'filas': [
+                    [f"${getattr(fila, atributo)}" if es_monto else str(getattr(fila, atributo))
+                     for _, atributo, es_monto in definicion['columnas']]
+                    for fila in filas
+                ],
+            }
+            if primero:
+                lineas = LINEAS_ENCABEZADO + [f"Fecha del Reporte: {ahora:%d/%m/%Y %H:%M:%S}"]
+                if periodo:
+                    lineas.append(f"Período: {periodo}")
+                tramo.update(titulo=definicion['titulo'], lineas=lineas)
+            if ultimo:
+                tramo['pie'] = f"{etiqueta_total}: ${total}"
+            _escribir(ruta, json.dumps(tramo))
+        else:
+            ruta = trabajos.ruta_tramo(carpeta, prefijo, numero, 'html')
+            contexto = {definicion['variable']: filas, variable_total: total}
+            _escribir(ruta, render_template(definicion['plantilla'], encabezado=primero, pie=ultimo,
+                                            now=ahora, periodo=periodo, **contexto))
+        entradas.append(ruta)
+
+    conversor = trabajos.tabla_a_pdf if motor == 'reportlab' else trabajos.html_a_pdf
+    return conversor, entradas
+
+
+def encolar(reporte, nombre_descarga, desde=None, hasta=None):
+    """Encola el reporte y devuelve el id del trabajo; la petición no lee ni escribe los tramos."""
+    app = current_app._get_current_object()
+    config = app.config
+    carpeta = config['TRABAJOS_FOLDER']
+    trabajo_id = trabajos.crear_trabajo(carpeta, nombre_descarga)
+
+    def generar_tramos():
+        # El hilo tiene su propio contexto de aplicación (y su propia sesión de base de datos)
+        with app.app_context():
+            conversor, entradas = escribir_tramos(reporte, carpeta, trabajo_id, config['PDF_MOTOR_TABLAS'],
+                                                  config['PDF_FILAS_POR_TRAMO'], desde, hasta)
+        trabajos.convertir_tramos(conversor, entradas, os.path.join(carpeta, f"{trabajo_id}.pdf"),
+                                  config['PDF_WORKERS'])
+
+    trabajos.encolar_en_hilo(carpeta, trabajo_id, generar_tramos)
+    return trabajo_id
+
+
+def generar(reporte, ruta, motor=None, desde=None, hasta=None):
+    """Genera el reporte en `ruta` y espera a que termine (CLI y benchmarks)."""
+    config = current_app.config
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    prefijo = os.path.splitext(os.path.basename(ruta))[0]
+    conversor, entradas = escribir_tramos(reporte, carpeta, prefijo, motor or config['PDF_MOTOR_TABLAS'],
+                                          config['PDF_FILAS_POR_TRAMO'], desde, hasta)
+    return trabajos.convertir_tramos(conversor, entradas, ruta, config['PDF_WORKERS'])
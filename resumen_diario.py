@@ -0,0 +1,66 @@
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Venta, Producto, VentaResumenDiario
+import archivo
+
+
+def _insertar_o_acumular(filas):
+    # INSERT ... ON CONFLICT DO UPDATE para que dos ventas simultáneas del
+    # mismo producto y día no choquen con la restricción única
+    dialecto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    tabla = VentaResumenDiario.__table__
+    stmt = dialecto.insert(tabla)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabla.c.fecha, tabla.c.producto_id],
+        set_={
+            'unidades': tabla.c.unidades + stmt.excluded.unidades,
+            'total': tabla.c.total + stmt.excluded.total,
+        },
+    )
+    db.session.execute(stmt, filas)
+
+
+def registrar_venta(venta, producto):
+    """Suma una venta al resumen de su día, dentro de la transacción en curso."""
+    db.session.flush()  # Asegura que la venta tenga su fecha asignada
+    _insertar_o_acumular([{
+        'fecha': venta.fecha.date(),
+        'producto_id': producto.id,
+        'categoria_id': producto.categoria_id,
+        'unidades': venta.cantidad,
+        'total': venta.total,
+    }])
+
+
+def registrar_ventas(fecha, filas):
+    """Suma varias líneas de venta del mismo momento en un solo executemany.
+
+    Cada fila es un diccionario con producto_id, categoria_id, unidades y total.
+    """
+    _insertar_o_acumular([dict(fila, fecha=fecha.date()) for fila in filas])
+
+
+def reconstruir():
+    """Vuelve a generar el resumen completo a partir de la tabla venta y su archivo."""
+    ventas = archivo.fuente(Venta)
+    fecha = func.date(ventas.fecha)
+    consulta = (
+        select(
+            fecha,
+            ventas.producto_id,
+            Producto.categoria_id,
+            func.sum(ventas.cantidad),
+            func.sum(ventas.total),
+        )
+        .join(Producto, ventas.producto_id == Producto.id)
+        .group_by(fecha, ventas.producto_id, Producto.categoria_id)
+    )
+    db.session.query(VentaResumenDiario).delete()
+    resultado = db.session.execute(
+        insert(VentaResumenDiario).from_select(
+            ['fecha', 'producto_id', 'categoria_id', 'unidades', 'total'], consulta
+        )
+    )
+    db.session.commit()
+    return resultado.rowcount
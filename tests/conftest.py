@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Usuario, Producto, Categoria
+
+# Pruebas con el perfil 'testing' (SQLite en memoria). Cada prueba recibe una
+# base nueva con un usuario admin/admin123. Desde la raíz del repositorio:
+#
+#   python -m pytest
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', {
+        'TRABAJOS_FOLDER': str(tmp_path / 'trabajos'),
+        'BOLETAS_FOLDER': str(tmp_path / 'boletas'),
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+    })
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(username='admin')
+        usuario.set_password('admin123')
+        db.session.add(usuario)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert respuesta.status_code == 302
+    return cliente
+
+
+@pytest.fixture
+def producto(app):
+    categoria = Categoria(nombre='Alimentos')
+    db.session.add(categoria)
+    db.session.flush()
+    producto = Producto(nombre='Alimento perro adulto', precio=1000, stock=100, categoria_id=categoria.id)
+    db.session.add(producto)
+    db.session.commit()
+    return producto
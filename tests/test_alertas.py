@@ -0,0 +1,4 @@
+def test_solo_el_dashboard_abre_el_stream_de_alertas(cliente):
+    assert b'/alertas/stream' in cliente.get('/dashboard').data
+    pagina = cliente.get('/agregar_producto').data
+    assert b'/alertas/stream' not in pagina and b'/alertas/cantidad' in pagina
@@ -0,0 +1,33 @@
+from sqlalchemy import text
+
+from models import db, Venta
+import analitica
+
+
+def _producto(resultado, producto_id):
+    return next((fila for fila in resultado['productos'] if fila['producto_id'] == producto_id), None)
+
+
+def test_categoria_vacia_se_lee_como_sin_categoria(app):
+    db.session.execute(text("INSERT INTO producto (nombre, precio, stock, categoria_id) VALUES ('Collar', 10, 1, '')"))
+    db.session.commit()
+    (categoria,) = analitica.analizar(30)['categorias']
+    assert categoria['categoria_id'] is None and categoria['categoria'] == 'Sin Categoría'
+
+
+def test_la_cache_se_renueva_con_cambios_del_catalogo(app, cliente, producto):
+    assert _producto(analitica.analizar(30), producto.id)['umbral'] == 5
+
+    cliente.post(f'/umbral_reposicion/{producto.id}', data={'umbral_reposicion': '20'})
+    assert _producto(analitica.analizar(30), producto.id)['umbral'] == 20
+
+    cliente.post(f'/eliminar_producto/{producto.id}')
+    assert _producto(analitica.analizar(30), producto.id) is None
+
+
+def test_la_cache_se_renueva_sin_invalidar_el_proceso(app, producto):
+    # Una venta registrada por otro worker no pasa por la caché de este proceso
+    assert _producto(analitica.analizar(30), producto.id)['unidades'] == 0
+    db.session.add(Venta(producto_id=producto.id, cantidad=3, precio_unitario=1000, total=3000))
+    db.session.commit()
+    assert _producto(analitica.analizar(30), producto.id)['unidades'] == 3
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+from models import db, HistorialStock
+import archivo
+import inventario
+
+
+@contextmanager
+def _sentencias():
+    ejecutadas = []
+
+    def registrar(conexion, cursor, sql, parametros, contexto, executemany):
+        ejecutadas.append(sql)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        yield ejecutadas
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+
+
+def _archivar_historial(producto):
+    db.session.add_all([
+        HistorialStock(producto_id=producto.id, cantidad_cambiada=100, motivo='Stock inicial',
+                       fecha=datetime(2023, 5, 1)),
+        HistorialStock(producto_id=producto.id, cantidad_cambiada=-30, motivo='Venta', fecha=datetime(2023, 11, 2)),
+        HistorialStock(producto_id=producto.id, cantidad_cambiada=-5, motivo='Venta', fecha=datetime(2024, 2, 3)),
+    ])
+    db.session.commit()
+    archivo.archivar(datetime(2024, 1, 1), informar=lambda mensaje: None)
+
+
+def test_stock_posterior_al_limite_no_lee_el_archivo(app, producto):
+    _archivar_historial(producto)
+    momento = datetime(2024, 3, 1)
+    with _sentencias() as ejecutadas:
+        fila = db.session.execute(inventario.consulta_valuacion(momento)).one()
+        assert inventario.stock_en(producto.id, momento) == 65
+    assert fila.stock == 65
+    assert not any('_archivo_' in sql for sql in ejecutadas)
+
+
+def test_stock_anterior_al_limite_lee_el_archivo(app, producto):
+    _archivar_historial(producto)
+    momento = datetime(2023, 6, 1)
+    with _sentencias() as ejecutadas:
+        fila = db.session.execute(inventario.consulta_valuacion(momento)).one()
+    assert fila.stock == 100
+    assert any('historial_stock_archivo_2023' in sql for sql in ejecutadas)
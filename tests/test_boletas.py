@@ -0,0 +1,41 @@
+import os
+
+from models import db, Venta
+import boletas
+
+
+def _vender(producto, cantidad):
+    venta = Venta(producto_id=producto.id, cantidad=cantidad, precio_unitario=producto.precio,
+                  total=producto.precio * cantidad)
+    db.session.add(venta)
+    db.session.commit()
+    return venta
+
+
+def test_la_clave_cambia_con_el_contenido_de_la_venta(app, producto):
+    venta = _vender(producto, 2)
+    antes = boletas.clave(venta, producto)
+    # Mismo id (SQLite lo reutiliza tras borrar la última venta) con otro contenido
+    venta.cantidad, venta.total = 3, 3000
+    assert boletas.clave(venta, producto) != antes
+
+
+def test_eliminar_el_producto_borra_sus_boletas(app, cliente, producto):
+    carpeta = app.config['BOLETAS_FOLDER']
+    venta_id = _vender(producto, 2).id
+    assert cliente.get(f'/emitir_boleta/{venta_id}').status_code == 200
+    assert any(nombre.startswith(f'boleta_{venta_id}_') for nombre in os.listdir(carpeta))
+
+    cliente.post(f'/eliminar_producto/{producto.id}')
+    assert os.listdir(carpeta) == []
+    assert cliente.get(f'/emitir_boleta/{venta_id}').status_code == 404
+
+
+def test_la_plantilla_se_lee_una_vez(app, producto, monkeypatch):
+    venta = _vender(producto, 1)
+    boletas.clave(venta, producto)
+    lecturas = []
+    cargador = app.jinja_env.loader
+    monkeypatch.setattr(type(cargador), 'get_source', lambda *args: lecturas.append(args) or ('', '', None))
+    boletas.clave(venta, producto)
+    assert lecturas == []
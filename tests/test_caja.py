@@ -0,0 +1,37 @@
+from models import db, Producto, Venta, HistorialStock
+
+
+def _productos(*stocks):
+    productos = [Producto(nombre=f'Producto {numero}', precio=1000, stock=stock) for numero, stock in enumerate(stocks)]
+    db.session.add_all(productos)
+    db.session.commit()
+    return [producto.id for producto in productos]
+
+
+def test_checkout_descuenta_todas_las_lineas(app, cliente):
+    primero, segundo = _productos(5, 5)
+    respuesta = cliente.post('/checkout', json={'lineas': [{'producto_id': primero, 'cantidad': 2},
+                                                           {'producto_id': segundo, 'cantidad': 5}]})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()['total'] == 7000
+    assert [db.session.get(Producto, id).stock for id in (primero, segundo)] == [3, 0]
+
+
+def test_stock_insuficiente_informa_el_producto_y_deshace_todo(app, cliente):
+    con_stock, sin_stock = _productos(5, 1)
+    respuesta = cliente.post('/checkout', json={'lineas': [{'producto_id': con_stock, 'cantidad': 2},
+                                                           {'producto_id': sin_stock, 'cantidad': 3}]})
+    assert respuesta.status_code == 409
+    assert respuesta.get_json()['productos'] == [{'producto_id': sin_stock, 'nombre': 'Producto 1', 'stock': 1}]
+    db.session.expire_all()
+    assert [db.session.get(Producto, id).stock for id in (con_stock, sin_stock)] == [5, 1]
+    assert db.session.query(Venta).count() == 0 and db.session.query(HistorialStock).count() == 0
+
+
+def test_api_usa_el_mismo_cobro(app, cliente):
+    (producto_id,) = _productos(1)
+    respuesta = cliente.post('/api/v1/ventas', json={'lineas': [{'producto_id': producto_id, 'cantidad': 2}]})
+    assert respuesta.status_code == 409
+    assert respuesta.get_json()['productos'][0]['producto_id'] == producto_id
+    respuesta = cliente.post('/api/v1/ventas', json={'lineas': [{'producto_id': producto_id, 'cantidad': 'x'}]})
+    assert respuesta.status_code == 400
@@ -0,0 +1,67 @@
+import sqlite3
+
+from sqlalchemy import event, func
+
+from app import create_app
+from models import db, Producto, Categoria, HistorialStock
+import importador
+
+
+def _importar(tmp_path, contenido):
+    ruta = tmp_path / 'productos.csv'
+    ruta.write_text(contenido, encoding='utf-8')
+    return importador.importar_productos(str(ruta))
+
+
+def test_categoria_vacia_no_cambia_la_de_un_producto_existente(app, tmp_path):
+    alimentos, juguetes = Categoria(nombre='Alimentos'), Categoria(nombre='Juguetes')
+    db.session.add_all([alimentos, juguetes])
+    db.session.flush()
+    db.session.add_all([Producto(nombre='Croquetas', precio=1000, stock=1, categoria_id=alimentos.id),
+                        Producto(nombre='Pelota', precio=500, stock=1, categoria_id=alimentos.id)])
+    db.session.commit()
+
+    resultado = _importar(tmp_path, "nombre,precio,stock,categoria\n"
+                                    "Croquetas,1200,4,\n"
+                                    "Pelota,600,2,Juguetes\n"
+                                    "Hueso,300,7,\n")
+    assert (resultado.insertados, resultado.actualizados, resultado.errores) == (1, 2, [])
+
+    productos = {p.nombre: p for p in Producto.query.all()}
+    assert (productos['Croquetas'].precio, productos['Croquetas'].stock) == (1200, 4)
+    assert productos['Croquetas'].categoria_id == alimentos.id
+    assert productos['Pelota'].categoria_id == juguetes.id
+    assert productos['Hueso'].categoria_id is None
+
+
+def test_el_stock_queda_bloqueado_entre_la_lectura_y_el_update(tmp_path):
+    # Con una base en archivo, otra conexión intenta vender justo cuando el importador lee el stock
+    ruta_base = tmp_path / 'importar.db'
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{ruta_base}"})
+    intentos = []
+
+    def vender_desde_otra_conexion(conexion, cursor, sql, parametros, contexto, executemany):
+        if sql.lstrip().startswith('SELECT producto.nombre'):
+            otra = sqlite3.connect(ruta_base, timeout=0)
+            try:
+                otra.execute("UPDATE producto SET stock = stock - 1 WHERE nombre = 'Croquetas'")
+                otra.commit()
+                intentos.append('vendió')
+            except sqlite3.OperationalError:
+                intentos.append('bloqueada')
+            finally:
+                otra.close()
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Producto(nombre='Croquetas', precio=1000, stock=10))
+        db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', vender_desde_otra_conexion)
+        _importar(tmp_path, "nombre,precio,stock\nCroquetas,1000,4\n")
+        event.remove(db.engine, 'before_cursor_execute', vender_desde_otra_conexion)
+
+        assert intentos == ['bloqueada']
+        assert db.session.query(func.sum(HistorialStock.cantidad_cambiada)).scalar() == -6
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
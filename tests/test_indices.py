@@ -0,0 +1,31 @@
+import os
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+
+from app import create_app
+from models import db
+import indices
+
+MIGRACIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def test_consultas_criticas_usan_indices(app):
+    assert indices.verificar_planes() == []
+
+
+def test_migraciones_crean_los_indices_de_los_modelos(tmp_path):
+    # La base migrada desde cero debe tener los mismos índices que declaran los
+    # modelos (un índice solo en una migración, o solo en models.py, es una deriva)
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'migrada.db'}"})
+    with app.app_context():
+        upgrade(MIGRACIONES)
+        with db.engine.connect() as conexion:
+            diferencias = compare_metadata(MigrationContext.configure(conexion), db.metadata)
+        # Las tablas de texto completo las crea busqueda.py, no los modelos
+        diferencias = [d for d in diferencias
+                       if not (d[0] == 'remove_table' and d[1].name.startswith('producto_fts'))]
+        assert diferencias == []
+        assert indices.verificar_planes() == []
+        db.engine.dispose()
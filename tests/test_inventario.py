@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from models import db, HistorialStock
+import inventario
+
+
+def test_valuacion_sin_corte_del_dia_usa_el_precio_del_ultimo_corte(app, producto):
+    db.session.add(HistorialStock(producto_id=producto.id, cantidad_cambiada=100, motivo='Stock inicial',
+                                  fecha=datetime(2025, 3, 1, 9)))
+    db.session.flush()
+    inventario.crear_cortes(datetime(2025, 3, 2))  # Guarda el precio de ese día: 1000
+    db.session.add(HistorialStock(producto_id=producto.id, cantidad_cambiada=-10, motivo='Venta',
+                                  fecha=datetime(2025, 3, 2, 10)))
+    producto.precio = 2000
+    db.session.commit()
+
+    fila = db.session.execute(inventario.consulta_valuacion(datetime(2025, 3, 3))).one()
+    assert (fila.stock, fila.precio, fila.valor) == (90, 1000, 90000)
@@ -0,0 +1,26 @@
+import logging
+
+from app import create_app
+from models import db, Usuario
+
+
+def test_consultas_lentas_no_registran_credenciales(tmp_path, caplog):
+    app = create_app('testing', {'METRICAS_HABILITADAS': True, 'METRICAS_CONSULTA_LENTA_MS': 0,
+                                 'TRABAJOS_FOLDER': str(tmp_path / 'trabajos')})
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(username='admin')
+        usuario.set_password('admin123')
+        db.session.add(usuario)
+        db.session.commit()
+        password_hash = usuario.password_hash
+
+        with caplog.at_level(logging.WARNING, logger='veterinaria.metricas'):
+            respuesta = app.test_client().post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert respuesta.status_code == 302
+
+        registro = caplog.text
+        assert 'Consulta lenta' in registro and "'username_1': '***'" in registro
+        assert "'admin'" not in registro and password_hash not in registro
+        db.session.remove()
+        db.drop_all()
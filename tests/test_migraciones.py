@@ -0,0 +1,74 @@
+import io
+import os
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect, text
+
+from app import create_app
+from models import db
+
+MIGRACIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# La cadena de migraciones se prueba en SQLite y, si TEST_POSTGRES_URL apunta a
+# una base vacía de PostgreSQL (requiere psycopg), también en PostgreSQL
+
+
+def _url_sqlite(tmp_path):
+    return f"sqlite:///{tmp_path / 'migrada.db'}"
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def url_base(request, tmp_path):
+    if request.param == 'sqlite':
+        return _url_sqlite(tmp_path)
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL no está definida.")
+    return url
+
+
+def test_cadena_completa_sube_y_baja(url_base):
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': url_base})
+    with app.app_context():
+        upgrade(MIGRACIONES)
+        tablas = set(inspect(db.engine).get_table_names())
+        assert set(db.metadata.tables) <= tablas
+        db.session.execute(text("INSERT INTO categoria (nombre) VALUES ('Alimentos')"))
+        db.session.commit()
+        assert db.session.execute(text("SELECT created_at FROM categoria")).scalar() is not None
+        db.session.remove()
+
+        downgrade(MIGRACIONES, revision='base')
+        assert set(inspect(db.engine).get_table_names()) <= {'alembic_version'}
+        upgrade(MIGRACIONES)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_categoria_vacia_queda_en_null(tmp_path):
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': _url_sqlite(tmp_path)})
+    with app.app_context():
+        upgrade(MIGRACIONES, revision='5d2c8e7a4f19')
+        db.session.execute(text("INSERT INTO producto (nombre, precio, stock, categoria_id) VALUES ('Collar', 10, 1, '')"))
+        db.session.commit()
+        upgrade(MIGRACIONES)
+        assert db.session.execute(text("SELECT categoria_id FROM producto")).scalar() is None
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_cadena_se_genera_como_sql_de_postgresql():
+    # Modo offline: se arma el SQL de toda la cadena sin servidor ni driver de PostgreSQL
+    scripts = ScriptDirectory(MIGRACIONES)
+    salida = io.StringIO()
+    contexto = MigrationContext.configure(dialect_name='postgresql', opts={'as_sql': True, 'output_buffer': salida})
+    with Operations.context(contexto):
+        for revision in reversed(list(scripts.walk_revisions())):
+            revision.module.upgrade()
+    sql = salida.getvalue()
+    assert 'CREATE TABLE venta' in sql
+    assert "DEFAULT now()" in sql
@@ -0,0 +1,51 @@
+from sqlalchemy import text
+
+from models import db, Producto
+from paginacion import paginar_ventas, paginar_historial
+
+
+def _recorrer(paginar, *args):
+    # Sigue los cursores de a 2 filas; el tope detecta una paginación que no avanza
+    ids, cursor = [], None
+    for _ in range(50):
+        pagina = paginar(*args, cursor=cursor, limite=2)
+        ids += [fila.id for fila in pagina]
+        cursor = pagina.siguiente
+        if cursor is None:
+            return ids
+    raise AssertionError(f"La paginación no termina: {ids[:10]}")
+
+
+def _vender(cliente, producto_id, veces):
+    for _ in range(veces):
+        assert cliente.post(f'/vender/{producto_id}', data={'cantidad': '1'}).status_code == 302
+
+
+def test_ventas_del_mismo_segundo(app, cliente, producto):
+    # Cinco ventas seguidas caen en el mismo segundo: cada una debe aparecer una sola vez
+    _vender(cliente, producto.id, 5)
+    assert _recorrer(paginar_ventas) == [5, 4, 3, 2, 1]
+
+
+def test_historial_del_mismo_segundo(app, cliente, producto):
+    _vender(cliente, producto.id, 5)
+    movimientos = _recorrer(paginar_historial, producto.id)
+    assert len(movimientos) == 5 and len(set(movimientos)) == 5
+
+
+def test_lineas_de_un_cobro_con_la_misma_fecha(app, cliente, producto):
+    # Las líneas de un carrito comparten exactamente la misma fecha; el id desempata
+    otros = [Producto(nombre=f'Snack gato {numero}', precio=500, stock=10) for numero in range(4)]
+    db.session.add_all(otros)
+    db.session.commit()
+    lineas = [{'producto_id': p.id, 'cantidad': 1} for p in [producto] + otros]
+    assert cliente.post('/checkout', json={'lineas': lineas}).status_code == 201
+    assert _recorrer(paginar_ventas) == [5, 4, 3, 2, 1]
+
+
+def test_fechas_con_un_solo_formato(app, cliente, producto):
+    # SQLite compara las fechas como texto: todas deben tener microsegundos, como los parámetros
+    _vender(cliente, producto.id, 2)
+    for tabla in ('venta', 'historial_stock'):
+        fechas = db.session.execute(text(f"SELECT fecha FROM {tabla}")).scalars().all()
+        assert fechas and all(len(fecha) == 26 for fecha in fechas), fechas
@@ -0,0 +1,8 @@
+from models import db, Producto
+
+
+def test_agregar_producto_sin_categoria_guarda_null(app, cliente):
+    respuesta = cliente.post('/agregar_producto', data={'nombre': 'Collar', 'precio': '2500', 'stock': '3',
+                                                        'categoria_id': '', 'umbral_reposicion': ''})
+    assert respuesta.status_code == 302
+    assert db.session.query(Producto.categoria_id).filter_by(nombre='Collar').scalar() is None
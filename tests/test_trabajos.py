@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from pypdf import PdfReader
+
+import trabajos
+
+
+def test_pool_roto_se_recrea():
+    # Un hijo que muere de golpe rompe el pool; el siguiente envío usa uno nuevo
+    with pytest.raises(BrokenProcessPool):
+        trabajos._enviar(os._exit, 1, procesos=1).result()
+    assert isinstance(trabajos._enviar(os.getpid, procesos=1).result(), int)
+
+
+def _reescribir(carpeta, trabajo_id, **cambios):
+    ruta = os.path.join(carpeta, f"{trabajo_id}.json")
+    with open(ruta) as archivo:
+        metadatos = json.load(archivo)
+    metadatos.update(cambios)
+    with open(ruta, 'w') as archivo:
+        json.dump(metadatos, archivo)
+
+
+def test_pendiente_de_un_proceso_muerto_queda_fallido(tmp_path):
+    carpeta = str(tmp_path)
+    trabajo_id = trabajos.crear_trabajo(carpeta, 'reporte.pdf')
+    assert trabajos.estado(carpeta, trabajo_id)['estado'] == 'pendiente'
+
+    proceso = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proceso.wait()
+    _reescribir(carpeta, trabajo_id, pid=proceso.pid)
+    assert trabajos.estado(carpeta, trabajo_id)['estado'] == 'error'
+    assert os.path.exists(os.path.join(carpeta, f"{trabajo_id}.error"))
+
+
+def test_pendiente_vencido_queda_fallido(tmp_path):
+    carpeta = str(tmp_path)
+    trabajo_id = trabajos.crear_trabajo(carpeta, 'reporte.pdf')
+    _reescribir(carpeta, trabajo_id, creado=time.time() - trabajos.MINUTOS_MAXIMOS_PENDIENTE * 60 - 1)
+    assert trabajos.estado(carpeta, trabajo_id)['estado'] == 'error'
+
+
+def test_unir_pdfs_conserva_todas_las_paginas(tmp_path):
+    rutas = []
+    for numero in range(3):
+        entrada = tmp_path / f'tramo{numero}.json'
+        entrada.write_text(json.dumps({'encabezados': ['Producto'],
+                                       'filas': [[f'Producto {numero}-{fila}'] for fila in range(120)]}))
+        rutas.append(trabajos.tabla_a_pdf(str(entrada), str(tmp_path / f'tramo{numero}.pdf')))
+    paginas = sum(len(PdfReader(ruta).pages) for ruta in rutas)
+
+    destino = trabajos.unir_pdfs(rutas, str(tmp_path / 'unido.pdf'))
+    unido = PdfReader(destino)
+    assert len(unido.pages) == paginas
+    texto = ''.join(pagina.extract_text() for pagina in unido.pages)
+    assert all(f'Producto {numero}-119' in texto for numero in range(3))
+
+
+def test_reporte_por_tramos_se_arma_fuera_de_la_peticion(app, cliente, producto):
+    app.config.update(PDF_MOTOR_TABLAS='reportlab', PDF_FILAS_POR_TRAMO=1, PDF_WORKERS=1)
+    respuesta = cliente.get('/generar_pdf_reporte_stock')
+    trabajo_id = respuesta.location.rsplit('/', 1)[-1]
+    for _ in range(300):
+        trabajo = trabajos.estado(app.config['TRABAJOS_FOLDER'], trabajo_id)
+        if trabajo['estado'] != 'pendiente':
+            break
+        time.sleep(0.1)
+    assert trabajo['estado'] == 'listo'
+    assert 'Alimento perro adulto' in PdfReader(trabajo['ruta']).pages[0].extract_text()
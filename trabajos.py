@@ -0,0 +1,366 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, StreamObject
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+from xhtml2pdf import pisa
+
+# Cola local de generación de PDF. El HTML se arma en la petición (necesita la
+# base de datos y Jinja) y xhtml2pdf corre en un pool de procesos, así el trabajo
+# de CPU se reparte entre núcleos y no bloquea al worker web.
+#
+# El estado de cada trabajo vive en archivos dentro de la carpeta de trabajos,
+# de modo que cualquier proceso del servidor puede responder por él:
+#   <id>.json  metadatos (nombre de descarga, fecha de creación, pid del proceso web)
+#   <id>.pdf   resultado listo
+#   <id>.error mensaje de error
+#
+# Los reportes largos se arman por tramos (ver reportes_pdf.py): un hilo escribe
+# cada tramo en <id>.tramoNNNNN.<ext>, el pool los convierte a PDF en paralelo y
+# al final los une en <id>.pdf copiando objeto por objeto (_UnionPdf). Así ningún
+# proceso tiene el reporte completo en memoria y la conversión escala con los núcleos.
+
+# Horas que se conservan los trabajos antes de borrarlos
+HORAS_RETENCION = 24
+# Un trabajo pendiente por más tiempo se da por fallido aunque su proceso siga vivo
+MINUTOS_MAXIMOS_PENDIENTE = 30
+
+_pool = None
+_bloqueo_pool = threading.Lock()
+
+
+def _obtener_pool(procesos=None):
+    global _pool
+    with _bloqueo_pool:
+        if _pool is None:
+            # 'spawn' evita heredar conexiones de base de datos e hilos del proceso web
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _descartar_pool(pool):
+    # Un pool roto (un hijo murió, p. ej. por falta de memoria) rechaza todo trabajo
+    # nuevo: se descarta para que el siguiente _obtener_pool cree otro
+    global _pool
+    with _bloqueo_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _enviar(funcion, *args, procesos=None):
+    """Envía `funcion` al pool; si el pool está roto lo recrea y reintenta una vez."""
+    pool = _obtener_pool(procesos)
+    try:
+        futuro = pool.submit(funcion, *args)
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        pool = _obtener_pool(procesos)
+        futuro = pool.submit(funcion, *args)
+
+    def _si_se_rompe(futuro):
+        if isinstance(futuro.exception(), BrokenProcessPool):
+            _descartar_pool(pool)
+
+    futuro.add_done_callback(_si_se_rompe)
+    return futuro
+
+
+def _escribir_atomico(ruta, contenido, modo='wb'):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, modo) as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def generar_pdf(html, ruta):
+    """Convierte HTML a PDF y lo escribe en `ruta`. Corre en el pool de procesos."""
+    pdf = BytesIO()
+    estado = pisa.CreatePDF(BytesIO(html.encode("UTF-8")), dest=pdf)
+    if estado.err:
+        raise RuntimeError(f"xhtml2pdf reportó {estado.err} errores al generar el PDF.")
+    _escribir_atomico(ruta, pdf.getvalue())
+    return ruta
+
+
+def html_a_pdf(entrada, salida):
+    """Convierte un tramo de HTML guardado en `entrada` a PDF."""
+    with open(entrada, encoding='utf-8') as archivo:
+        return generar_pdf(archivo.read(), salida)
+
+
+def tabla_a_pdf(entrada, salida):
+    """Escribe un tramo de tabla (JSON) directo a PDF con reportlab, sin pasar por HTML.
+
+    El JSON tiene titulo, lineas (del encabezado), encabezados, filas y pie;
+    titulo, lineas y pie solo vienen en el primer y el último tramo.
+    """
+    with open(entrada, encoding='utf-8') as archivo:
+        tramo = json.load(archivo)
+    estilos = getSampleStyleSheet()
+    elementos = []
+    if tramo.get('titulo'):
+        elementos.append(Paragraph(tramo['titulo'], estilos['Title']))
+        elementos += [Paragraph(linea, estilos['Normal']) for linea in tramo.get('lineas', [])]
+        elementos.append(Spacer(1, 12))
+    tabla = LongTable([tramo['encabezados']] + tramo['filas'], repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f4f4f4')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+    ]))
+    elementos.append(tabla)
+    if tramo.get('pie'):
+        elementos += [Spacer(1, 12), Paragraph(f"<b>{tramo['pie']}</b>", estilos['Normal'])]
+
+    pdf = BytesIO()
+    SimpleDocTemplate(pdf, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30).build(elementos)
+    _escribir_atomico(salida, pdf.getvalue())
+    return salida
+
+
+# Atributos de página que un PDF puede dejar en el árbol de páginas en vez de en cada página
+_HEREDABLES = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+
+class _UnionPdf:
+    """Escribe un PDF objeto por objeto: en memoria solo queda el tramo que se está copiando.
+
+    El objeto 1 es el árbol de páginas y el 2 el catálogo; se escriben al final,
+    cuando ya se conocen todas las páginas. Del resto solo se guarda su posición
+    en el archivo para la tabla xref.
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.posiciones = {}
+        self.paginas = []
+        self._siguiente = 3
+        archivo.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _escribir_objeto(self, numero, objeto):
+        self.posiciones[numero] = self.archivo.tell()
+        self.archivo.write(b"%d 0 obj\n" % numero)
+        objeto.write_to_stream(self.archivo)
+        self.archivo.write(b"\nendobj\n")
+
+    def agregar(self, ruta):
+        lector = PdfReader(ruta)
+        numeros, pendientes = {}, deque()
+
+        def referencia(indirecto):
+            clave = (indirecto.idnum, indirecto.generation)
+            if clave not in numeros:
+                numeros[clave] = self._siguiente
+                self._siguiente += 1
+                pendientes.append((indirecto, numeros[clave]))
+            return IndirectObject(numeros[clave], 0, None)
+
+        def copiar(objeto, es_pagina=False):
+            if isinstance(objeto, IndirectObject):
+                return referencia(objeto)
+            if isinstance(objeto, StreamObject):
+                copia = StreamObject()
+                copia._data = objeto._data  # Los bytes tal como están en el archivo, sin decodificar
+                copia.update({clave: copiar(valor) for clave, valor in objeto.items() if clave != '/Length'})
+                return copia
+            if isinstance(objeto, DictionaryObject):
+                # El /Parent de una página apunta al árbol del tramo, que no se copia
+                return DictionaryObject({clave: copiar(valor) for clave, valor in objeto.items()
+                                         if not (es_pagina and clave == '/Parent')})
+            if isinstance(objeto, ArrayObject):
+                return ArrayObject(copiar(valor) for valor in objeto)
+            return objeto
+
+        for pagina in lector.pages:
+            self.paginas.append(referencia(pagina.indirect_reference))
+        while pendientes:
+            indirecto, numero = pendientes.popleft()
+            objeto = indirecto.get_object()
+            es_pagina = isinstance(objeto, DictionaryObject) and objeto.get('/Type') == '/Page'
+            copia = copiar(objeto, es_pagina)
+            if es_pagina:
+                copia[NameObject('/Parent')] = IndirectObject(1, 0, None)
+                nodo = objeto.get('/Parent')
+                while nodo is not None:
+                    nodo = nodo.get_object()
+                    for clave in _HEREDABLES:
+                        if clave not in copia and clave in nodo:
+                            copia[NameObject(clave)] = copiar(nodo[clave])
+                    nodo = nodo.get('/Parent')
+            self._escribir_objeto(numero, copia)
+
+    def cerrar(self):
+        self._escribir_objeto(1, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self.paginas),
+            NameObject('/Count'): NumberObject(len(self.paginas)),
+        }))
+        self._escribir_objeto(2, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(1, 0, None),
+        }))
+        inicio_xref = self.archivo.tell()
+        self.archivo.write(b"xref\n0 %d\n0000000000 65535 f \n" % self._siguiente)
+        for numero in range(1, self._siguiente):
+            self.archivo.write(b"%010d 00000 n \n" % self.posiciones[numero])
+        self.archivo.write(b"trailer\n<< /Size %d /Root 2 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                           % (self._siguiente, inicio_xref))
+
+
+def unir_pdfs(rutas, destino):
+    """Une los PDF de `rutas` en `destino` de a un tramo por vez; corre en el pool de procesos.
+
+    PdfWriter.append arma el documento completo en memoria antes de escribirlo;
+    aquí cada objeto se escribe en cuanto se copia, así la memoria depende del
+    tramo más grande y no del largo del reporte.
+    """
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        union = _UnionPdf(archivo)
+        for ruta in rutas:
+            union.agregar(ruta)
+        union.cerrar()
+    os.replace(temporal, destino)
+    return destino
+
+
+def ruta_tramo(carpeta, trabajo_id, numero, extension):
+    return os.path.join(carpeta, f"{trabajo_id}.tramo{numero:05d}.{extension}")
+
+
+def convertir_tramos(convertir, entradas, destino, procesos=None):
+    """Convierte cada tramo a PDF en el pool, une los resultados en `destino` y borra los tramos."""
+    salidas = [f"{os.path.splitext(entrada)[0]}.pdf" for entrada in entradas]
+    try:
+        futuros = [_enviar(convertir, entrada, salida, procesos=procesos) for entrada, salida in zip(entradas, salidas)]
+        for futuro in futuros:
+            futuro.result()
+        _enviar(unir_pdfs, salidas, destino, procesos=procesos).result()
+    finally:
+        for ruta in entradas + salidas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+    return destino
+
+
+def _ejecutar_trabajo(html, carpeta, trabajo_id):
+    try:
+        generar_pdf(html, os.path.join(carpeta, f"{trabajo_id}.pdf"))
+    except Exception as e:
+        _escribir_atomico(os.path.join(carpeta, f"{trabajo_id}.error"), str(e), 'w')
+
+
+def renderizar(html, ruta, procesos=None):
+    """Genera un PDF en el pool y espera el resultado (para documentos pequeños)."""
+    return _enviar(generar_pdf, html, ruta, procesos=procesos).result()
+
+
+def crear_trabajo(carpeta, nombre_descarga):
+    """Registra un trabajo pendiente y devuelve su id."""
+    os.makedirs(carpeta, exist_ok=True)
+    limpiar(carpeta)
+    trabajo_id = uuid.uuid4().hex
+    metadatos = {'nombre': nombre_descarga, 'creado': time.time(), 'pid': os.getpid()}
+    _escribir_atomico(os.path.join(carpeta, f"{trabajo_id}.json"), json.dumps(metadatos), 'w')
+    return trabajo_id
+
+
+def encolar(html, carpeta, nombre_descarga, procesos=None):
+    """Encola la generación de un PDF y devuelve el id del trabajo."""
+    trabajo_id = crear_trabajo(carpeta, nombre_descarga)
+    futuro = _enviar(_ejecutar_trabajo, html, carpeta, trabajo_id, procesos=procesos)
+
+    def _al_terminar(futuro):
+        # Si el proceso hijo murió sin poder escribir su propio error
+        if futuro.exception() is not None:
+            _escribir_atomico(os.path.join(carpeta, f"{trabajo_id}.error"), str(futuro.exception()), 'w')
+
+    futuro.add_done_callback(_al_terminar)
+    return trabajo_id
+
+
+def encolar_en_hilo(carpeta, trabajo_id, generar):
+    """Corre `generar()` en un hilo para un trabajo ya creado, sin bloquear la petición.
+
+    `generar` escribe <id>.pdf (p. ej. con convertir_tramos); si falla, el
+    error queda en <id>.error.
+    """
+    def coordinar():
+        # Un hilo del proceso web lee los datos y espera al pool; la conversión y la unión corren en el pool
+        try:
+            generar()
+        except Exception as e:
+            _escribir_atomico(os.path.join(carpeta, f"{trabajo_id}.error"), str(e), 'w')
+
+    threading.Thread(target=coordinar, daemon=True).start()
+
+
+def estado(carpeta, trabajo_id):
+    """Devuelve el estado del trabajo: None si no existe, o un diccionario."""
+    base = os.path.join(carpeta, trabajo_id)
+    if not trabajo_id.isalnum() or not os.path.exists(f"{base}.json"):
+        return None
+    with open(f"{base}.json") as archivo:
+        metadatos = json.load(archivo)
+
+    if os.path.exists(f"{base}.pdf"):
+        metadatos.update(estado='listo', ruta=f"{base}.pdf")
+    elif os.path.exists(f"{base}.error"):
+        with open(f"{base}.error") as archivo:
+            metadatos.update(estado='error', error=archivo.read())
+    elif _abandonado(metadatos):
+        # Quien lo esperaba ya no existe (el worker se reinició): se marca fallido
+        # para que el cliente deje de consultar y pueda volver a pedirlo
+        mensaje = "El trabajo se interrumpió antes de terminar. Vuelve a generar el reporte."
+        _escribir_atomico(f"{base}.error", mensaje, 'w')
+        metadatos.update(estado='error', error=mensaje)
+    else:
+        metadatos.update(estado='pendiente')
+    return metadatos
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, pero es de otro usuario
+    return True
+
+
+def _abandonado(metadatos):
+    # gunicorn recicla los workers (max_requests) y el hilo que unía los tramos
+    # muere con ellos; el pid y la edad del trabajo delatan esos pendientes huérfanos
+    if time.time() - metadatos['creado'] > MINUTOS_MAXIMOS_PENDIENTE * 60:
+        return True
+    pid = metadatos.get('pid')
+    return pid is not None and pid != os.getpid() and not _proceso_vivo(pid)
+
+
+def limpiar(carpeta, horas=HORAS_RETENCION):
+    limite = time.time() - horas * 3600
+    for nombre in os.listdir(carpeta):
+        ruta = os.path.join(carpeta, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass  # Otro proceso pudo haberlo borrado primero
@@ -0,0 +1,9 @@
+import os
+
+from app import create_app
+
+# Punto de entrada para servidores WSGI con varios workers:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#   waitress-serve --threads=8 --port=8000 wsgi:app   (Windows)
+# El perfil se elige con VETERINARIA_CONFIG (por defecto, production).
+app = create_app(os.environ.get('VETERINARIA_CONFIG', 'production'))